@@ -0,0 +1,42 @@
+"""
+Cold-start benchmark: wall time of fresh Python processes importing the package or running the CLI.
+Run it from the repository root: python benchmarks/bench_cold_start.py
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "src")
+
+CASES = {
+    "python (baseline)": ["-c", "pass"],
+    "import eia_client": ["-c", "import eia_client"],
+    "eia --help": ["-m", "eia_client", "--help"],
+    "eia fetch --help": ["-m", "eia_client", "fetch", "--help"],
+    "eia_client.EIAPolarClient": ["-c", "import eia_client; eia_client.EIAPolarClient"],
+    "import polars, duckdb, requests": ["-c", "import polars, duckdb, requests"],
+}
+
+
+def time_process(args: list, repeat: int = 7) -> list:
+    env = {**os.environ, "PYTHONPATH": SRC}
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, *args], env=env, check=True, capture_output=True
+        )
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+if __name__ == "__main__":
+    print(f"{'case':<35}{'median [ms]':>12}{'min [ms]':>12}")
+    for name, args in CASES.items():
+        timings = time_process(args)
+        print(
+            f"{name:<35}{statistics.median(timings) * 1000:>12.1f}{min(timings) * 1000:>12.1f}"
+        )
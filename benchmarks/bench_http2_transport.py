@@ -0,0 +1,126 @@
+"""
+Transport benchmark: concurrent chunk requests over HTTP/1.1 (RequestsTransport) and HTTP/2
+(HTTP2Transport), against a local HTTP/2-capable stand-in of the EIA API (hypercorn, cleartext h2c).
+Reports the throughput and the number of TCP connections opened by each transport.
+Requires: pip install "httpx[http2]" hypercorn
+Run it from the repository root: python benchmarks/bench_http2_transport.py
+Note: the stand-in is served in cleartext, so the TLS set-up saved per connection is not measured.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+from eia_client.transport import HTTP2Transport, RequestsTransport
+
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
+
+HOST, PORT = "127.0.0.1", 8766
+LATENCY = 0.05  # seconds per response, i.e. server side work
+ROWS = 500  # rows per response
+N_REQUESTS = 400
+CONCURRENCY = (8, 32, 64)
+
+BODY = json.dumps(
+    {
+        "response": {
+            "data": [
+                {
+                    "period": "2024-01-01T00",
+                    "subba": "SDGE",
+                    "parent": "CISO",
+                    "value": "1234.0",
+                }
+            ]
+            * ROWS
+        }
+    }
+).encode()
+connections = set()
+
+
+async def app(scope, receive, send):
+    """ASGI stand-in of an EIA route: fixed payload after LATENCY seconds."""
+    if scope["type"] != "http":
+        return
+    connections.add(tuple(scope["client"]))
+    await asyncio.sleep(LATENCY)
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(BODY)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": BODY})
+
+
+def start_server() -> threading.Event:
+    stop = threading.Event()
+    config = Config()
+    config.bind = [f"{HOST}:{PORT}"]
+    config.loglevel = "WARNING"
+
+    def run():
+        async def main():
+            loop = asyncio.get_running_loop()
+            await serve(
+                app,
+                config,
+                shutdown_trigger=lambda: loop.run_in_executor(None, stop.wait),
+            )
+
+        asyncio.run(main())
+
+    threading.Thread(target=run, daemon=True).start()
+    time.sleep(1.0)  # Let hypercorn bind
+    return stop
+
+
+def run_case(transport, concurrency: int) -> tuple:
+    url = (
+        f"http://{HOST}:{PORT}/v2/electricity/rto/region-sub-ba-data/data/?data[]=value"
+    )
+    connections.clear()
+    with transport, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        responses = list(
+            executor.map(
+                lambda i: transport(url, {"api_key": f"k{i}"}), range(N_REQUESTS)
+            )
+        )
+        elapsed = time.perf_counter() - start
+    assert all(response.ok for response in responses)
+    return N_REQUESTS / elapsed, len(connections)
+
+
+if __name__ == "__main__":
+    stop = start_server()
+    print(
+        f"{N_REQUESTS} requests, {LATENCY * 1000:.0f} ms server latency, {len(BODY) / 1e3:.0f} kB responses\n"
+    )
+    print(f"{'transport':<34}{'concurrency':>12}{'req/s':>10}{'connections':>13}")
+    for concurrency in CONCURRENCY:
+        cases = {
+            "HTTP/1.1 (requests)": RequestsTransport(pool_maxsize=concurrency),
+            "HTTP/2 (httpx, max 1 conn.)": HTTP2Transport(
+                max_connections=1, prior_knowledge=True
+            ),
+            "HTTP/2 (httpx, max 4 conn.)": HTTP2Transport(
+                max_connections=4, prior_knowledge=True
+            ),
+            "HTTP/2 (httpx, default 32 conn.)": HTTP2Transport(prior_knowledge=True),
+        }
+        for name, transport in cases.items():
+            throughput, n_connections = run_case(transport, concurrency)
+            print(f"{name:<34}{concurrency:>12}{throughput:>10.1f}{n_connections:>13}")
+    stop.set()
@@ -0,0 +1,12 @@
+from setuptools import find_packages, setup
+
+setup(
+    name="eia-client",
+    version="0.1.0",
+    description="A blazing fast client to extract and analyse data from the EIA API v2",
+    package_dir={"": "src"},
+    packages=find_packages("src", include=["eia_client", "eia_client.*"]),
+    install_requires=["duckdb", "numpy", "polars", "pyarrow", "requests"],
+    extras_require={"http2": ["httpx[http2]"]},
+    entry_points={"console_scripts": ["eia=eia_client.cli:main"]},
+)
@@ -1,2 +1,32 @@
-from .eia_old_client import EIAClient
-from .eia_polar_client import EIAPolarClient
+"""
+EIA API clients. The clients (and their heavy dependencies: polars, duckdb and requests)
+are imported lazily on first access, so importing the package, or running the CLI, is cheap.
+"""
+
+import importlib
+
+_LAZY_ATTRIBUTES = {
+    "APIKeyPool": ".key_pool",
+    "ArrowChunkStore": ".chunk_store",
+    "EIACachingProxy": ".proxy",
+    "EIAClient": ".eia_old_client",
+    "EIAPolarClient": ".eia_polar_client",
+    "DuckDBRollups": ".rollups",
+    "QueryPlan": ".planner",
+    "RequestStats": ".planner",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRIBUTES:
+        module = importlib.import_module(_LAZY_ATTRIBUTES[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value  # Cache it, next accesses skip __getattr__
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,209 @@
+"""
+This module contains the AdaptiveController class and the fetch_adaptively scheduler, which tune the
+chunk width and the concurrency of the requests from the observed latency, throughput and errors
+(AIMD: additive increase, multiplicative decrease), and hedge the chunks slower than a latency percentile.
+"""
+
+import datetime
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional
+
+import requests
+
+EIA_MAX_ROWS = 5000  # Maximum number of rows returned by the EIA API per request
+
+
+class AdaptiveController:
+    """
+    AIMD state of an adaptive fetch.
+    - rows_per_request grows by rows_step after each chunk answered within target_latency, and is halved
+      after a slower chunk or an error.
+    - concurrency grows by one after a full round of successful chunks, and is halved after an error.
+    - Chunks in flight for longer than the hedge_percentile of the recent latencies get a duplicate
+      (hedged) request, the first response wins."""
+
+    def __init__(
+        self,
+        rows_per_request: int = 4000,
+        rows_step: int = 500,
+        max_rows_request: int = EIA_MAX_ROWS,
+        target_latency: float = 5.0,
+        concurrency: int = 4,
+        max_concurrency: int = 16,
+        hedge_percentile: float = 0.9,
+        hedge_min_samples: int = 5,
+        max_retries: int = 3,
+    ):
+        self.rows_per_request = min(rows_per_request, max_rows_request)
+        self.rows_step = rows_step
+        self.max_rows_request = max_rows_request
+        self.target_latency = target_latency
+        self.concurrency = concurrency
+        self.max_concurrency = max_concurrency
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.max_retries = max_retries
+        self.latencies = deque(maxlen=100)
+        self.n_requests = 0
+        self.n_errors = 0
+        self.n_hedged = 0
+        self.rows_fetched = 0
+        self.__successes_in_round = 0
+        self.__lock = threading.Lock()
+
+    def __str__(self) -> str:
+        return (
+            f"AdaptiveController(rows_per_request={self.rows_per_request}, concurrency={self.concurrency}, "
+            f"requests={self.n_requests}, errors={self.n_errors}, hedged={self.n_hedged})"
+        )
+
+    def on_success(self, latency: float, rows: int) -> None:
+        """Record a successful chunk request and adapt the chunk width and concurrency."""
+        with self.__lock:
+            self.n_requests += 1
+            self.rows_fetched += rows
+            self.latencies.append(latency)
+            if latency <= self.target_latency:
+                self.rows_per_request = min(
+                    self.rows_per_request + self.rows_step, self.max_rows_request
+                )
+            else:
+                self.rows_per_request = max(self.rows_per_request // 2, 1)
+
+            # One additive step of concurrency per round of successful requests
+            self.__successes_in_round += 1
+            if self.__successes_in_round >= self.concurrency:
+                self.__successes_in_round = 0
+                self.concurrency = min(self.concurrency + 1, self.max_concurrency)
+
+    def on_error(self) -> None:
+        """Record a failed chunk request (e.g. 429, 5xx or a timeout) and back off."""
+        with self.__lock:
+            self.n_requests += 1
+            self.n_errors += 1
+            self.rows_per_request = max(self.rows_per_request // 2, 1)
+            self.concurrency = max(self.concurrency // 2, 1)
+            self.__successes_in_round = 0
+
+    def hedge_after(self) -> Optional[float]:
+        """Latency (seconds) after which an in-flight chunk is hedged, None until enough samples."""
+        with self.__lock:
+            if len(self.latencies) < self.hedge_min_samples:
+                return None
+            latencies = sorted(self.latencies)
+        return latencies[
+            min(int(len(latencies) * self.hedge_percentile), len(latencies) - 1)
+        ]
+
+    def chunk_hours(self, n_timeseries: int) -> int:
+        """Width (hours) of the next chunk for n_timeseries rows per hour."""
+        return max(self.rows_per_request // n_timeseries, 1)
+
+
+def is_retriable(error: Exception) -> bool:
+    """Rate limits, server errors, timeouts and dropped connections are worth retrying."""
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, requests.exceptions.RequestException)
+
+
+def fetch_adaptively(
+    fetch_window: Callable,
+    start: datetime.datetime,
+    end: datetime.datetime,
+    n_timeseries: int,
+    controller: AdaptiveController,
+) -> list:
+    """
+    Fetch the hours start..end in chunks sized and scheduled by the controller.
+    Args:
+        fetch_window (Callable): Function (start, end) -> pl.DataFrame fetching one chunk.
+        start (datetime): The start of the time range.
+        end (datetime): The end of the time range (inclusive).
+        n_timeseries (int): Number of time series returned per hour.
+        controller (AdaptiveController): The AIMD state, updated in place.
+    Returns:
+        list: (start, end, pl.DataFrame) tuples sorted by start.
+    Raises:
+        requests.exceptions.RequestException: If a chunk fails with a non-retriable error, or too often.
+    """
+    one_hour = datetime.timedelta(hours=1)
+    queue = deque()  # Windows to (re)try, before carving new ones from the cursor
+    cursor = start
+    results = {}
+    in_flight = {}  # future -> task
+    tasks = (
+        []
+    )  # tasks not done yet: {"window", "started", "futures", "retries", "hedged"}
+
+    executor = ThreadPoolExecutor(max_workers=2 * controller.max_concurrency)
+    try:
+        while cursor <= end or queue or tasks:
+            # Submit new chunks up to the current concurrency
+            while len(tasks) < controller.concurrency and (queue or cursor <= end):
+                if queue:
+                    window, retries = queue.popleft()
+                else:
+                    width = datetime.timedelta(
+                        hours=controller.chunk_hours(n_timeseries)
+                    )
+                    window, retries = (cursor, min(cursor + width - one_hour, end)), 0
+                    cursor = window[1] + one_hour
+                task = {
+                    "window": window,
+                    "started": time.monotonic(),
+                    "retries": retries,
+                    "hedged": False,
+                }
+                in_flight[executor.submit(fetch_window, *window)] = task
+                tasks.append(task)
+
+            done, _ = wait(list(in_flight), timeout=0.05, return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+
+            for future in done:
+                task = in_flight.pop(future)
+                if task not in tasks:
+                    continue  # The other (hedged) request already won
+                error = future.exception()
+                if error is None:
+                    df = future.result()
+                    results[task["window"][0]] = (*task["window"], df)
+                    controller.on_success(now - task["started"], df.height)
+                    tasks.remove(task)
+                elif any(f for f, t in in_flight.items() if t is task):
+                    controller.on_error()  # Let the hedged twin answer
+                else:
+                    controller.on_error()
+                    tasks.remove(task)
+                    if (
+                        not is_retriable(error)
+                        or task["retries"] >= controller.max_retries
+                    ):
+                        raise error
+                    # Split the failed window in halves, so the retries match the smaller chunk width
+                    w_start, w_end = task["window"]
+                    n_hours = int((w_end - w_start) / one_hour) + 1
+                    if n_hours > 1:
+                        w_mid = w_start + one_hour * (n_hours // 2)
+                        queue.append(((w_start, w_mid - one_hour), task["retries"] + 1))
+                        queue.append(((w_mid, w_end), task["retries"] + 1))
+                    else:
+                        queue.append((task["window"], task["retries"] + 1))
+
+            # Hedge the stragglers
+            hedge_after = controller.hedge_after()
+            if hedge_after is not None:
+                for task in tasks:
+                    if not task["hedged"] and now - task["started"] > hedge_after:
+                        task["hedged"] = True
+                        controller.n_hedged += 1
+                        in_flight[executor.submit(fetch_window, *task["window"])] = task
+    finally:
+        # Do not wait for the losing (hedged) requests
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return [results[key] for key in sorted(results)]
@@ -0,0 +1,102 @@
+"""
+This module contains align_hourly, which lays several long EIA DataFrames (one per route/facets spec)
+side by side on a single hourly period grid, one value column per series, namespaced by spec name
+and named after the facets of the spec.
+The rows are placed by position (hour offset from the start), so no join nor re-sort is needed.
+"""
+
+import datetime
+from typing import Optional
+
+import numpy as np
+import polars as pl
+
+ONE_HOUR = datetime.timedelta(hours=1)
+NON_SERIES_COLUMNS = ("period", "value", "value-units")
+
+
+def series_columns(df: pl.DataFrame) -> list:
+    """
+    Columns identifying the series of a long EIA DataFrame, e.g. subba and parent, or respondent
+    and fueltype. The descriptive "-name" columns and the units are left out.
+    """
+    return [
+        col
+        for col in df.columns
+        if col not in NON_SERIES_COLUMNS and not col.endswith("-name")
+    ]
+
+
+def pinned_columns(facets: Optional[dict]) -> set:
+    """
+    Columns fixed to a single value by the facets of a request, e.g. {"parent": "CISO"} pins parent.
+    """
+    pinned = set()
+    for col, value in (facets or {}).items():
+        if isinstance(value, str) or (
+            isinstance(value, (list, tuple)) and len(value) == 1
+        ):
+            pinned.add(col)
+    return pinned
+
+
+def align_hourly(
+    dfs: dict,
+    start: datetime.datetime,
+    end: datetime.datetime,
+    facets: Optional[dict] = None,
+    separator: str = ".",
+) -> pl.DataFrame:
+    """
+    Build a wide DataFrame with the hours start..end (inclusive) and one Float64 column per series.
+    The columns are named <spec name><separator><series ids>, where the ids are the values of the
+    series columns not pinned to a single value by the facets of the spec (e.g. "demand.SDGE" for
+    {"parent": "CISO"}); a spec whose facets pin every series column keeps its bare name. The names
+    depend on the request, not on which series vary in the data. Hours missing from a series are null,
+    series missing from the data have no column.
+    Args:
+        dfs (dict): {spec name: formatted long DataFrame sorted by period}.
+        start (datetime.datetime): First hour of the grid (naive UTC).
+        end (datetime.datetime): Last hour of the grid (naive UTC).
+        facets (dict, optional): {spec name: facets dict or None}; a spec without facets is named
+            by all its series columns.
+    Returns:
+        pl.DataFrame: The period column (UTC) followed by the value columns.
+    Raises:
+        ValueError: If two series get the same column name.
+    """
+    facets = facets or {}
+    n_hours = int((end - start) / ONE_HOUR) + 1
+    origin = np.datetime64(start, "us")
+    one_hour = np.timedelta64(1, "h")
+
+    columns = {
+        "period": pl.datetime_range(
+            start, end, interval="1h", closed="both", time_zone="UTC", eager=True
+        )
+    }
+
+    def add(column: str, values) -> None:
+        if column in columns:
+            raise ValueError(
+                f"Duplicate aligned column name {column!r}, rename the specs"
+            )
+        columns[column] = pl.Series(column, values, nan_to_null=True)
+
+    for name, df in dfs.items():
+        pinned = pinned_columns(facets.get(name))
+        if df.is_empty():
+            continue
+        ids = [col for col in series_columns(df) if col not in pinned]
+        parts = df.partition_by(ids, maintain_order=True) if ids else [df]
+        for part in parts:
+            column = separator.join([name] + [str(part[col][0]) for col in ids])
+            # Hour offsets on the grid; the part is sorted by period, the grid too
+            periods = part["period"].dt.replace_time_zone(None).to_numpy()
+            positions = ((periods - origin) // one_hour).astype(np.int64)
+            in_grid = (positions >= 0) & (positions < n_hours)
+            values = np.full(n_hours, np.nan)
+            values[positions[in_grid]] = part["value"].to_numpy()[in_grid]
+            add(column, values)
+
+    return pl.DataFrame(columns)
@@ -0,0 +1,77 @@
+"""
+This module contains the DuckDBChunkHashes class, which keeps a content fingerprint per fetched chunk
+(series key and time window) alongside the EIA data table in DuckDB. Refreshes compare the fingerprints
+of the refetched chunks with the stored ones, so unchanged chunks are neither formatted nor rewritten.
+"""
+
+import datetime
+import hashlib
+import json
+
+import duckdb
+
+
+def fingerprint_rows(rows: list) -> str:
+    """
+    SHA-256 of the raw JSON rows of a chunk, independent of the order of the rows and of their keys.
+    Args:
+        rows (list): The "data" list of an API response.
+    Returns:
+        str: The hexadecimal digest.
+    """
+    lines = sorted(json.dumps(row, sort_keys=True) for row in rows)
+    return hashlib.sha256("\n".join(lines).encode()).hexdigest()
+
+
+class DuckDBChunkHashes:
+    """
+    The table <table_name>_chunk_hashes with one row per (series key, window): the fingerprint and
+    the number of rows of the chunk as last written, and when it was written."""
+
+    def __init__(self, con: duckdb.DuckDBPyConnection, table_name: str = "eia_data"):
+        self.con = con
+        self.hash_table = f"{table_name}_chunk_hashes"
+        self.con.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.hash_table} (
+                series_key VARCHAR,
+                window_start TIMESTAMP,
+                window_end TIMESTAMP,
+                fingerprint VARCHAR,
+                n_rows BIGINT,
+                updated_at TIMESTAMP,
+                PRIMARY KEY (series_key, window_start, window_end)
+            )
+            """)
+
+    # ================================================
+    # Public Methods
+    # ================================================
+    def get(self, series_key: str) -> dict:
+        """
+        Returns:
+            dict: {(window_start, window_end): fingerprint} of a series key, naive UTC datetimes.
+        """
+        records = self.con.execute(
+            f"SELECT window_start, window_end, fingerprint FROM {self.hash_table} WHERE series_key = ?",
+            [series_key],
+        ).fetchall()
+        return {(start, end): fingerprint for start, end, fingerprint in records}
+
+    def put(self, series_key: str, chunks: list) -> None:
+        """
+        Insert or replace the fingerprints of written chunks.
+        Args:
+            series_key (str): See chunk_store.series_key.
+            chunks (list): (window_start, window_end, fingerprint, n_rows) tuples.
+        """
+        if not chunks:
+            return None
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        self.con.executemany(
+            f"INSERT OR REPLACE INTO {self.hash_table} VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (series_key, start, end, fingerprint, n_rows, now)
+                for start, end, fingerprint, n_rows in chunks
+            ],
+        )
+        return None
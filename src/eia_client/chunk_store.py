@@ -0,0 +1,223 @@
+"""
+This module contains the ArrowChunkStore class, a local store of fetched EIA chunks saved as
+uncompressed Arrow IPC (Feather v2) files, so they can be memory-mapped on reload.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import time
+from typing import Optional
+
+import polars as pl
+
+WINDOW_FORMAT = "%Y%m%dT%H"
+
+
+def _naive_utc(dt: datetime.datetime) -> datetime.datetime:
+    """Naive UTC datetime of a naive (taken as UTC) or timezone-aware datetime."""
+    if dt.tzinfo is None:
+        return dt
+    return dt.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def series_key(api_path: str, facets: Optional[dict]) -> str:
+    """Normalise api_path and facets (JSON) so equivalent requests share the same key."""
+    facets = facets or {}
+    norm_facets = {
+        name: sorted([value] if isinstance(value, str) else list(value))
+        for name, value in sorted(facets.items())
+    }
+    return json.dumps(
+        {"api_path": api_path.strip("/"), "facets": norm_facets}, sort_keys=True
+    )
+
+
+class ArrowChunkStore:
+    """
+    A directory of formatted EIA chunks, one uncompressed Arrow IPC file per (api_path, facets, window).
+    The index is the directory layout itself:
+
+        <root>/<series key hash>/key.json                   -> {"api_path": ..., "facets": ...}
+        <root>/<series key hash>/<start>_<end>.arrow        -> chunk with hours start..end (inclusive)
+
+    Files are written to a temporary name and renamed into place, so several processes can share a store.
+    Reloads use memory-mapping, hence the chunks are neither copied nor deserialised.
+    EIA revises the recent hours for a while: a chunk ending less than revision_hours before it was
+    written is served for max_age seconds only, then requested again. Older chunks never expire.
+    Args:
+        root (str): Directory of the store.
+        max_age (float, optional): Seconds the recent chunks are served (None: forever).
+        revision_hours (int): Hours after which the data of an hour is considered final.
+    """
+
+    def __init__(
+        self,
+        root: str = "./data/chunks",
+        max_age: Optional[float] = 3600.0,
+        revision_hours: int = 168,
+    ):
+        self.root = root
+        self.max_age = max_age
+        self.revision_hours = revision_hours
+        os.makedirs(self.root, exist_ok=True)
+
+    def __str__(self) -> str:
+        return f"Arrow IPC chunk store at {self.root}"
+
+    # ================================================
+    # Private Methods
+    # ================================================
+    def __series_dir(self, api_path: str, facets: Optional[dict]) -> str:
+        """Return (and create) the directory holding the chunks of a series key."""
+        key_json = series_key(api_path, facets)
+        key_hash = hashlib.sha1(key_json.encode()).hexdigest()[:16]
+        series_dir = os.path.join(self.root, key_hash)
+        if not os.path.isdir(series_dir):
+            os.makedirs(series_dir, exist_ok=True)
+            with open(os.path.join(series_dir, "key.json"), "w") as f:
+                f.write(key_json)
+        return series_dir
+
+    def __slice_window(
+        self, df: pl.DataFrame, start: datetime.datetime, end: datetime.datetime
+    ) -> pl.DataFrame:
+        """Zero-copy slice of a period-sorted chunk to the hours start..end (inclusive)."""
+        periods = df["period"]
+        lo = periods.search_sorted(
+            start.replace(tzinfo=datetime.timezone.utc), side="left"
+        )
+        hi = periods.search_sorted(
+            end.replace(tzinfo=datetime.timezone.utc), side="right"
+        )
+        return df.slice(lo, hi - lo)
+
+    def __is_fresh(self, end: datetime.datetime, path: str) -> bool:
+        """False if a chunk may have been revised since it was written, i.e. it is recent and expired."""
+        if self.max_age is None:
+            return True
+        written = os.path.getmtime(path)
+        if time.time() - written <= self.max_age:
+            return True
+        written_hour = datetime.datetime.fromtimestamp(
+            written, datetime.timezone.utc
+        ).replace(tzinfo=None)
+        return end < written_hour - datetime.timedelta(hours=self.revision_hours)
+
+    def __covered_end(
+        self, df: pl.DataFrame, start: datetime.datetime, n_timeseries: int
+    ) -> Optional[datetime.datetime]:
+        """
+        Last hour h such that every hour start..h has its n_timeseries rows, None if start itself does not.
+        Responses miss the unpublished (latest) hours and may be cut at the API row cap.
+        """
+        counts = df.group_by("period").len().sort("period")
+        hours = counts["period"].dt.replace_time_zone(None).to_list()
+        covered_end = None
+        expected = start
+        for hour, n_rows in zip(hours, counts["len"].to_list()):
+            if hour != expected or n_rows < n_timeseries:
+                break
+            covered_end = hour
+            expected = hour + datetime.timedelta(hours=1)
+        return covered_end
+
+    # ================================================
+    # Public Methods
+    # ================================================
+    def windows(self, api_path: str, facets: Optional[dict] = None) -> list:
+        """
+        List the stored windows of a series key.
+        Returns:
+            list: (start, end, path) tuples sorted by start, with naive UTC datetimes.
+        """
+        series_dir = self.__series_dir(api_path, facets)
+        windows = []
+        for file_name in os.listdir(series_dir):
+            if not file_name.endswith(".arrow"):
+                continue
+            start_str, end_str = file_name[: -len(".arrow")].split("_")
+            windows.append(
+                (
+                    datetime.datetime.strptime(start_str, WINDOW_FORMAT),
+                    datetime.datetime.strptime(end_str, WINDOW_FORMAT),
+                    os.path.join(series_dir, file_name),
+                )
+            )
+        return sorted(windows)
+
+    def put(
+        self,
+        df: pl.DataFrame,
+        api_path: str,
+        facets: Optional[dict],
+        start: datetime.datetime,
+        end: datetime.datetime,
+        n_timeseries: Optional[int] = None,
+    ) -> Optional[str]:
+        """
+        Persist a formatted (period-sorted) chunk requested for the hours start..end. Only the hours
+        actually covered are stored, i.e. the window is cut before the first hour missing (unpublished
+        or beyond the API row cap), so get() never serves an incomplete range.
+        start and end are naive UTC, or timezone-aware.
+        Args:
+            n_timeseries (int, optional): Rows expected per hour, defaults to the most rows of an hour in df.
+        Returns:
+            str: The path of the Arrow IPC file, None if not even the first hour is covered.
+        """
+        if df.is_empty():
+            return None
+        start, end = _naive_utc(start), _naive_utc(end)
+        if n_timeseries is None:
+            n_timeseries = df.group_by("period").len()["len"].max()
+        covered_end = self.__covered_end(df, start, n_timeseries)
+        if covered_end is None:
+            return None
+        if covered_end < end:
+            end = covered_end
+            df = self.__slice_window(df, start, end)
+
+        series_dir = self.__series_dir(api_path, facets)
+        file_name = (
+            f"{start.strftime(WINDOW_FORMAT)}_{end.strftime(WINDOW_FORMAT)}.arrow"
+        )
+        path = os.path.join(series_dir, file_name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        # Uncompressed, so the file can be memory-mapped as-is on reload
+        df.write_ipc(tmp_path, compression="uncompressed")
+        os.replace(tmp_path, path)
+        return path
+
+    def get(
+        self,
+        api_path: str,
+        facets: Optional[dict],
+        start: datetime.datetime,
+        end: datetime.datetime,
+    ) -> Optional[pl.DataFrame]:
+        """
+        Assemble the hours start..end (naive UTC, or timezone-aware) from memory-mapped chunks.
+        Expired chunks (see max_age) are left out.
+        Returns:
+            pl.DataFrame: The requested range sorted by period, or None if the stored chunks do not cover it.
+        """
+        start, end = _naive_utc(start), _naive_utc(end)
+        # Walk the sorted windows and pick, at each step, the one reaching furthest
+        pieces = []
+        cursor = start
+        windows = [
+            w for w in self.windows(api_path, facets) if self.__is_fresh(w[1], w[2])
+        ]
+        while cursor <= end:
+            candidates = [w for w in windows if w[0] <= cursor <= w[1]]
+            if not candidates:
+                return None
+            w_start, w_end, path = max(candidates, key=lambda w: w[1])
+            chunk = pl.read_ipc(path, memory_map=True)
+            pieces.append(self.__slice_window(chunk, cursor, min(w_end, end)))
+            cursor = w_end + datetime.timedelta(hours=1)
+
+        # Pieces are disjoint and ordered, so no re-sort (nor rechunk copy) is needed
+        df = pl.concat(pieces, rechunk=False)
+        return df.with_columns(pl.col("period").set_sorted())
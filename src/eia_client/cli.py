@@ -0,0 +1,399 @@
+"""
+Command line interface of the EIA client, e.g.
+
+    eia fetch electricity/rto/region-sub-ba-data/data/ --facet parent=CISO --facet subba=SDGE \
+        --start 2024-01-01T00 --end 2025-01-01T00 --output ./data/raw/eia_SDGE_2024.parquet
+    eia sync electricity/rto/region-sub-ba-data/data/ --facet parent=CISO --start 2024-01-01 --end 2024-02-01
+    eia export --db ./data/raw/eia_data.duckdb --output ./data/raw/eia_data.parquet
+    eia compact --db ./data/raw/eia_data.duckdb --every 86400
+
+Only argparse and the standard library are imported at start-up; polars, duckdb and requests
+are imported by the command that needs them.
+"""
+
+import argparse
+import datetime
+import os
+import sys
+from typing import Optional
+
+API_PATH_EXAMPLE = "electricity/rto/region-sub-ba-data/data/"
+
+
+def _parse_datetime(value: str) -> datetime.datetime:
+    """Parse e.g. 2024-01-01 or 2024-01-01T05 (hours, UTC)."""
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"invalid datetime {value!r}, expected e.g. 2024-01-01 or 2024-01-01T05"
+        )
+
+
+def _parse_facets(facets: Optional[list]) -> Optional[dict]:
+    """Turn repeated name=value arguments into the facets dictionary of the client."""
+    if not facets:
+        return None
+    facets_dict = {}
+    for facet in facets:
+        name, sep, value = facet.partition("=")
+        if not sep:
+            raise SystemExit(f"eia: invalid facet {facet!r}, expected name=value")
+        facets_dict.setdefault(name, []).append(value)
+    return {
+        name: values[0] if len(values) == 1 else values
+        for name, values in facets_dict.items()
+    }
+
+
+def _get_client(args):
+    from .eia_polar_client import EIAPolarClient
+
+    chunk_store = None
+    if getattr(args, "chunk_store", None):
+        from .chunk_store import ArrowChunkStore
+
+        chunk_store = ArrowChunkStore(args.chunk_store)
+
+    # Comma-separated keys are used as a pool
+    api_key = (
+        args.api_key.split(",")
+        if args.api_key and "," in args.api_key
+        else args.api_key
+    )
+    return EIAPolarClient(
+        api_key,
+        chunk_store=chunk_store,
+        base_url=args.base_url,
+        transport=args.transport,
+    )
+
+
+def _fetch(args):
+    client = _get_client(args)
+    return client.get_eia_hourly_data(
+        api_path=args.api_path,
+        facets=_parse_facets(args.facet),
+        start=args.start,
+        end=args.end,
+        max_rows_request=args.max_rows_request,
+        adaptive=args.adaptive,
+    )
+
+
+# ================================================
+# Commands
+# ================================================
+def cmd_fetch(args) -> int:
+    """Fetch hourly data and write it to Parquet (or print it)."""
+    df = _fetch(args)
+    if args.output:
+        df.write_parquet(args.output)
+        print(f"\n{df.height} rows written to {args.output}")
+    else:
+        print(df)
+    return 0
+
+
+def cmd_sync(args) -> int:
+    """Fetch hourly data and upsert it into a DuckDB file (rollups included)."""
+    client = _get_client(args)
+    rollups = None if args.no_rollups else ("daily", "weekly", "monthly", "yearly")
+    if args.changed_only:
+        df = client.refresh_duckdb(
+            args.api_path,
+            facets=_parse_facets(args.facet),
+            start=args.start,
+            end=args.end,
+            path=args.db,
+            table_name=args.table,
+            max_rows_request=args.max_rows_request,
+            rollups=rollups,
+        )
+        print(f"\n{df.height} new or revised rows synced into {args.db} ({args.table})")
+        return 0
+    df = _fetch(args)
+    client.save_df_as_duckdb(df, path=args.db, table_name=args.table, rollups=rollups)
+    print(f"\n{df.height} rows synced into {args.db} ({args.table})")
+    return 0
+
+
+def cmd_export(args) -> int:
+    """Export a DuckDB table to Parquet, sorted by period."""
+    import duckdb
+
+    con = duckdb.connect(args.db, read_only=True)
+    try:
+        output = args.output.replace("'", "''")
+        con.execute(
+            f"COPY (SELECT * FROM {args.table} ORDER BY period) "
+            f"TO '{output}' (FORMAT PARQUET)"
+        )
+    finally:
+        con.close()
+    print(f"\n{args.table} exported to {args.output}")
+    return 0
+
+
+def cmd_plan(args) -> int:
+    """Dry run: print the chunk plan with its estimated rows, bytes, memory and duration."""
+    client = _get_client(args)
+    if args.stats and os.path.exists(args.stats):
+        client.request_stats.load(args.stats)
+    plan = client.plan(
+        api_path=args.api_path,
+        facets=_parse_facets(args.facet),
+        start=args.start,
+        end=args.end,
+        max_rows_request=args.max_rows_request,
+        concurrency=args.concurrency,
+        rate_limit=args.rate_limit,
+    )
+    print(plan)
+    return 0
+
+
+def cmd_enqueue(args) -> int:
+    """Coordinator: plan the chunks of a backfill and add them to a shared work queue."""
+    from .work_queue import SQLiteWorkQueue, enqueue_backfill
+
+    queue = SQLiteWorkQueue(args.queue)
+    enqueue_backfill(
+        _get_client(args),
+        queue,
+        api_path=args.api_path,
+        facets=_parse_facets(args.facet),
+        start=args.start,
+        end=args.end,
+        max_rows_request=args.max_rows_request,
+    )
+    print(queue.progress())
+    return 0
+
+
+def cmd_work(args) -> int:
+    """Worker: fetch the chunks of a shared work queue into a shared chunk store."""
+    from .chunk_store import ArrowChunkStore
+    from .work_queue import SQLiteWorkQueue, run_worker
+
+    queue = SQLiteWorkQueue(args.queue, lease_seconds=args.lease_seconds)
+    n_fetched = run_worker(
+        _get_client(args),
+        queue,
+        ArrowChunkStore(args.chunk_store),
+        poll_interval=args.poll_interval,
+        exit_when_finished=not args.forever,
+    )
+    print(f"\n{n_fetched} chunks fetched, queue: {queue.progress()}")
+    return 0
+
+
+def cmd_proxy(args) -> int:
+    """Run the local caching proxy shared by all the EIA clients of the host."""
+    from .proxy import EIACachingProxy
+
+    proxy = EIACachingProxy(
+        cache_dir=args.cache_dir,
+        max_cache_bytes=int(args.max_cache_mb * 1e6),
+        max_age=args.max_age or None,
+        host=args.host,
+        port=args.port,
+        timeout=args.timeout or None,
+        pool_maxsize=args.pool_maxsize,
+    )
+    print(f"Point the clients at it with: export EIA_BASE_URL={proxy.base_url}")
+    try:
+        proxy.serve_forever()
+    except KeyboardInterrupt:
+        proxy.shutdown()
+    return 0
+
+
+def cmd_compact(args) -> int:
+    """Compact the local store (DuckDB file and/or Parquet files), once or on a schedule."""
+    from .maintenance import BackgroundMaintenance
+
+    if args.parquet and not args.parquet_output:
+        raise SystemExit("eia: --parquet-output is required with --parquet")
+    maintenance = BackgroundMaintenance(
+        interval_seconds=args.every or 0.0,
+        duckdb_path=args.db if os.path.exists(args.db) or not args.parquet else None,
+        table_name=args.table,
+        parquet_source=args.parquet,
+        parquet_output=args.parquet_output,
+        remove_inputs=args.remove_inputs,
+    )
+    if not args.every:
+        maintenance.run_once()
+        return 0
+    print(f"Running {maintenance} (Ctrl+C to stop)")
+    maintenance.start()
+    try:
+        maintenance.thread.join()
+    except KeyboardInterrupt:
+        maintenance.stop()
+    return 0
+
+
+# ================================================
+# Parser
+# ================================================
+def _add_client_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--api-key",
+        default=os.getenv("EIA_API_KEY"),
+        help="Defaults to the EIA_API_KEY environment variable, comma-separated for a pool of keys",
+    )
+    parser.add_argument(
+        "--base-url",
+        help="API base url, e.g. a local 'eia proxy' (defaults to EIA_BASE_URL or the EIA API)",
+    )
+    parser.add_argument(
+        "--transport",
+        choices=("auto", "http1", "http2"),
+        default="auto",
+        help="HTTP/2 needs httpx[http2]; auto falls back to HTTP/1.1 without it",
+    )
+
+
+def _add_fetch_arguments(parser: argparse.ArgumentParser) -> None:
+    _add_client_arguments(parser)
+    parser.add_argument("api_path", help=f"API route, e.g. {API_PATH_EXAMPLE}")
+    parser.add_argument(
+        "--facet",
+        action="append",
+        metavar="NAME=VALUE",
+        help="Facet filter, repeat it for several facets or values (e.g. --facet parent=CISO)",
+    )
+    parser.add_argument(
+        "--start", type=_parse_datetime, required=True, help="e.g. 2024-01-01T00"
+    )
+    parser.add_argument(
+        "--end", type=_parse_datetime, required=True, help="e.g. 2025-01-01T00"
+    )
+    parser.add_argument("--max-rows-request", type=int, default=4000)
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Adapt chunk width and concurrency to the observed latency, hedging slow chunks",
+    )
+    parser.add_argument(
+        "--chunk-store", help="Directory of the Arrow IPC chunk store (optional)"
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="eia", description="Extract hourly data from the EIA API v2."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    fetch = subparsers.add_parser("fetch", help=cmd_fetch.__doc__)
+    _add_fetch_arguments(fetch)
+    fetch.add_argument(
+        "--output", "-o", help="Parquet file (prints the data if omitted)"
+    )
+    fetch.set_defaults(func=cmd_fetch)
+
+    sync = subparsers.add_parser("sync", help=cmd_sync.__doc__)
+    _add_fetch_arguments(sync)
+    sync.add_argument("--db", default="./data/raw/eia_data.duckdb")
+    sync.add_argument("--table", default="eia_data")
+    sync.add_argument(
+        "--no-rollups",
+        action="store_true",
+        help="Do not create the rollup tables (those already in the file are still refreshed)",
+    )
+    sync.add_argument(
+        "--changed-only",
+        action="store_true",
+        help="Skip the chunks unchanged since the last sync (content hashes) and upsert only revised rows",
+    )
+    sync.set_defaults(func=cmd_sync)
+
+    export = subparsers.add_parser("export", help=cmd_export.__doc__)
+    export.add_argument("--db", default="./data/raw/eia_data.duckdb")
+    export.add_argument("--table", default="eia_data")
+    export.add_argument("--output", "-o", required=True, help="Parquet file")
+    export.set_defaults(func=cmd_export)
+
+    plan = subparsers.add_parser("plan", help=cmd_plan.__doc__)
+    _add_fetch_arguments(plan)
+    plan.add_argument("--concurrency", type=int)
+    plan.add_argument("--rate-limit", type=float, help="Requests per second")
+    plan.add_argument(
+        "--stats", help="JSON file of recorded request stats (RequestStats.save)"
+    )
+    plan.set_defaults(func=cmd_plan)
+
+    enqueue = subparsers.add_parser("enqueue", help=cmd_enqueue.__doc__)
+    _add_fetch_arguments(enqueue)
+    enqueue.add_argument("--queue", default="./data/queue/eia_queue.sqlite")
+    enqueue.set_defaults(func=cmd_enqueue)
+
+    work = subparsers.add_parser("work", help=cmd_work.__doc__)
+    _add_client_arguments(work)
+    work.add_argument("--queue", default="./data/queue/eia_queue.sqlite")
+    work.add_argument(
+        "--chunk-store", required=True, help="Directory of the shared chunk store"
+    )
+    work.add_argument("--lease-seconds", type=float, default=300.0)
+    work.add_argument("--poll-interval", type=float, default=1.0)
+    work.add_argument(
+        "--forever", action="store_true", help="Keep polling once the queue is finished"
+    )
+    work.set_defaults(func=cmd_work)
+
+    proxy = subparsers.add_parser("proxy", help=cmd_proxy.__doc__)
+    proxy.add_argument("--host", default="127.0.0.1")
+    proxy.add_argument("--port", type=int, default=8765)
+    proxy.add_argument("--cache-dir", default="./data/proxy_cache")
+    proxy.add_argument("--max-cache-mb", type=float, default=1024.0)
+    proxy.add_argument(
+        "--max-age",
+        type=float,
+        default=3600.0,
+        help="Seconds a response is cached (0: forever)",
+    )
+    proxy.add_argument(
+        "--timeout",
+        type=float,
+        default=60.0,
+        help="Seconds before an upstream request (or a wait on one) is answered with a 504 (0: no limit)",
+    )
+    proxy.add_argument(
+        "--pool-maxsize",
+        type=int,
+        default=32,
+        help="Upstream connections kept open (concurrent requests)",
+    )
+    proxy.set_defaults(func=cmd_proxy)
+
+    compact = subparsers.add_parser("compact", help=cmd_compact.__doc__)
+    compact.add_argument("--db", default="./data/raw/eia_data.duckdb")
+    compact.add_argument("--table", default="eia_data")
+    compact.add_argument(
+        "--parquet",
+        help="Path or glob of Parquet files to merge, e.g. './data/raw/*.parquet'",
+    )
+    compact.add_argument("--parquet-output", help="Merged Parquet file")
+    compact.add_argument(
+        "--remove-inputs",
+        action="store_true",
+        help="Delete the merged Parquet files (kept by default)",
+    )
+    compact.add_argument(
+        "--every", type=float, help="Run every EVERY seconds instead of once"
+    )
+    compact.set_defaults(func=cmd_compact)
+
+    return parser
+
+
+def main(argv: Optional[list] = None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
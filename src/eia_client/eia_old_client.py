@@ -4,17 +4,40 @@ Original code from: Rami Krispin https://github.com/LinkedInLearning/data-pipeli
 OOP Refactoring and extra methods by: Jorge Thomas https://github.com/jorgethomasm
 """
 import datetime
-import requests
+import os
 from typing import Optional, Union
 import polars as pl
 import duckdb
 
+from .key_pool import APIKeyPool, as_key_pool
+from .transport import Transport, make_transport
+
 
 class EIAClient:
     BASE_URL = "https://api.eia.gov/v2/"
 
-    def __init__(self, api_key):
-        self.api_key = api_key
+    def __init__(
+        self,
+        api_key: Union[str, list, APIKeyPool],
+        base_url: Optional[str] = None,
+        transport: Union[str, Transport] = "auto",
+    ):
+        # A list of keys (or an APIKeyPool) spreads the requests across the keys' rate budgets
+        self.api_key = as_key_pool(api_key)
+        # e.g. a local EIACachingProxy shared by all the clients of the host
+        self.BASE_URL = base_url or os.getenv("EIA_BASE_URL") or self.BASE_URL
+        # HTTP/2 if httpx[http2] is installed, HTTP/1.1 otherwise
+        self.transport = make_transport(transport)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        """Close the connections of the transport."""
+        self.transport.close()
 
     def __get_data(self, endpoint: str, params=None):
         params = params or {}
@@ -22,7 +45,10 @@ class EIAClient:
 
         full_url = f"{self.BASE_URL}{endpoint}"
         print(f"Requesting...\n{full_url}")
-        response = requests.get(url=full_url, params=params)
+        if isinstance(self.api_key, APIKeyPool):
+            response = self.api_key.request(self.transport, full_url, params)
+        else:
+            response = self.transport(full_url, params)
         response.raise_for_status()
         return response.json()
 
@@ -5,13 +5,21 @@ Date: 2025-03-01
 """
 
 import datetime
+import os
+import time
 from concurrent.futures import ThreadPoolExecutor
 from math import ceil
-from typing import Optional
+from typing import Optional, Union
 
-import duckdb
 import polars as pl
-import requests
+
+from .adaptive import AdaptiveController, fetch_adaptively
+from .aligned import align_hourly
+from .chunk_store import ArrowChunkStore, series_key
+from .key_pool import APIKeyPool, as_key_pool
+from .planner import QueryPlan, RequestStats, build_plan
+from .singleflight import ChunkCoalescer, SingleFlight
+from .transport import Transport, make_transport
 
 
 class EIAPolarClient:
@@ -22,8 +30,25 @@ class EIAPolarClient:
 
     BASE_URL = "https://api.eia.gov/v2/"
 
-    def __init__(self, api_key):
-        self.api_key = api_key
+    def __init__(
+        self,
+        api_key: Union[str, list, APIKeyPool],
+        chunk_store: Optional[ArrowChunkStore] = None,
+        base_url: Optional[str] = None,
+        transport: Union[str, Transport] = "auto",
+    ):
+        # A list of keys (or an APIKeyPool) spreads the requests across the keys' rate budgets
+        self.api_key = as_key_pool(api_key)
+        # e.g. a local EIACachingProxy shared by all the clients of the host
+        self.BASE_URL = base_url or os.getenv("EIA_BASE_URL") or self.BASE_URL
+        # HTTP/2 multiplexes the concurrent chunks over a few connections (HTTP/1.1 if unavailable)
+        self.transport = make_transport(transport)
+        self.chunk_store = chunk_store
+        # Latency, size and rows of the responses, to calibrate the plans
+        self.request_stats = RequestStats()
+        # Concurrent calls (threads) share identical requests and overlapping chunks in flight
+        self.__single_flight = SingleFlight()
+        self.__coalescer = ChunkCoalescer()
 
     def __str__(self) -> str:
         """Return a user-friendly string representation of the client."""
@@ -33,12 +58,19 @@ class EIAPolarClient:
         """Return True if the client has an API key set."""
         return bool(self.api_key)
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
     # ================================================
     # Private Methods
     # ================================================
     def __fetch_data(self, url: str, params: dict) -> dict:
         """
-        Fetch data from a single URL.
+        Fetch data from a single URL. Identical requests in flight (e.g. from other threads)
+        share one upstream request and its result.
         Args:
             url (str): The API endpoint URL.
             params (dict): Query parameters for the API request.
@@ -47,9 +79,27 @@ class EIAPolarClient:
         Raises:
             requests.exceptions.RequestException: If the API request fails.
         """
-        response = requests.get(url=url, params=params)
+        key = (
+            url,
+            tuple(sorted((k, str(v)) for k, v in params.items() if k != "api_key")),
+        )
+        return self.__single_flight.do(key, lambda: self.__send_request(url, params))
+
+    def __send_request(self, url: str, params: dict) -> dict:
+        """Send the request (with a key of the pool, if any) and record its stats."""
+        start_time = time.perf_counter()
+        if isinstance(self.api_key, APIKeyPool):
+            response = self.api_key.request(self.transport, url, params)
+        else:
+            response = self.transport(url, params)
         response.raise_for_status()
-        return response.json()
+        payload = response.json()
+        self.request_stats.record(
+            time.perf_counter() - start_time,
+            len(response.content),
+            len(payload["response"]["data"]),
+        )
+        return payload
 
     def __probe_data(self, endpoint_url: str, params=None) -> int:
         """Fetch one hour of data to check how the chunks will be divided.
@@ -75,54 +125,77 @@ class EIAPolarClient:
 
         return n_timeseries
 
-    def __get_data_as_df(self, endpoints_urls: list, params=None) -> pl.DataFrame:
+    def __fetch_window(self, api_path, facets, start, end) -> pl.DataFrame:
         """
-        Fetches data from multiple API endpoints and returns a concatenated Polars DataFrame.
-        This method sends GET requests to the provided list of endpoint URLs using a thread pool
-        for concurrent execution. The responses are parsed into JSON, converted into Polars
-        DataFrames, and concatenated into a single DataFrame.
+        Fetch and format the hours start..end (inclusive) of a request. Hours already in flight
+        for the same api_path and facets (e.g. in other threads) are awaited instead of fetched again.
+        Returns:
+            pl.DataFrame: The formatted DataFrame sorted by period (empty if there is no data).
+        """
+        return self.__coalescer.fetch(
+            series_key(api_path, facets),
+            start,
+            end,
+            lambda dt_start, dt_end: self.__fetch_window_uncoalesced(
+                api_path, facets, dt_start, dt_end
+            ),
+        )
+
+    def __fetch_window_uncoalesced(self, api_path, facets, start, end) -> pl.DataFrame:
+        """Fetch and format the hours start..end (inclusive) with a request of its own."""
+        endpoint = self.__generate_endpoint(api_path, facets, start, end)
+        payload = self.__send_request(endpoint, {"api_key": self.api_key})
+        df = pl.DataFrame(payload["response"]["data"])
+        return df if df.is_empty() else self.__format_df_columns(df)
+
+    def __get_chunks_as_dfs(self, api_path, facets, windows) -> list:
+        """
+        Fetches the chunks (time windows) of a request and returns one Polars DataFrame per chunk.
+        This method sends the GET requests using a thread pool for concurrent execution. The
+        responses are parsed into JSON and converted into formatted Polars DataFrames, in the same
+        order as the windows.
         Args:
-            endpoints_urls (list): A list of endpoint URLs to fetch data from.
-            params (dict, optional): Additional query parameters to include in the API requests.
-                Defaults to None. The API key is automatically added to the parameters.
+            api_path (str): The API path to be appended to the base URL.
+            facets (dict): A dictionary of facets to filter the API request.
+            windows (list): The (start, end) tuples from __generate_chunk_windows.
         Returns:
-            pl.DataFrame: A concatenated Polars DataFrame containing the data retrieved from
-            all the endpoints.
+            list: A list of formatted Polars DataFrames (possibly empty), one per window.
         Raises:
             requests.exceptions.RequestException: If any of the API requests fail.
-            ValueError: If the resulting DataFrame is empty, indicating no data was retrieved.
         """
-        params = params or {}
-        params["api_key"] = self.api_key
-
-        # Ad-hoc function to map with ThreadPoolExecutor
-        # def fetch_data(url:str) -> dict:
-        #     """Fetch data from a single URL."""
-        #     response = requests.get(url=url, params=params)
-        #     response.raise_for_status()
-        #     return response.json()
-
         with ThreadPoolExecutor() as executor:
-            list_with_eia_payloads = list(
-                executor.map(lambda url: self.__fetch_data(url, params), endpoints_urls)
+            return list(
+                executor.map(
+                    lambda w: self.__fetch_window(api_path, facets, *w), windows
+                )
             )
-            # list_with_eia_payloads = list(executor.map(self.__fetch_data, endpoints_urls))
 
-        # Generate a list of DataFrames from the list of dictionaries
+    def __get_data_as_df(self, api_path, facets, windows) -> pl.DataFrame:
+        """
+        Fetches the chunks of a request and returns a concatenated Polars DataFrame.
+        See __get_chunks_as_dfs for the concurrent requests.
+        Returns:
+            pl.DataFrame: A concatenated Polars DataFrame containing the data retrieved from
+            all the chunks, sorted by period.
+        Raises:
+            requests.exceptions.RequestException: If any of the API requests fail.
+            ValueError: If the resulting DataFrame is empty, indicating no data was retrieved.
+        """
         list_with_dfs = [
-            pl.DataFrame(data["response"]["data"]) for data in list_with_eia_payloads
+            df
+            for df in self.__get_chunks_as_dfs(api_path, facets, windows)
+            if not df.is_empty()
         ]
 
-        # Concatenate the list of DataFrames into a single DataFrame
-        df = pl.concat(list_with_dfs)
-
         # Check if the DataFrame is empty
-        if df.is_empty():
+        if not list_with_dfs:
             raise ValueError(
                 "The DataFrame is empty. No data was retrieved from the API."
             )
 
-        return df
+        # Windows are disjoint and ordered, hence the concatenation is already sorted
+        df = pl.concat(list_with_dfs)
+        return df.with_columns(pl.col("period").set_sorted())
 
     def __generate_probe_endpoint(self, api_path, facets, start, end) -> list:
         """
@@ -137,8 +210,8 @@ class EIAPolarClient:
             str: The generated probe endpoint URL as a string.
         Notes:
             - The frequency is hardcoded to "hourly".
-            - The `end` parameter is not directly used in the function, but the probe endpoint
-              uses `start` and adds one hour to it to define the end time for the probe.
+            - The `end` parameter is not directly used in the function, the probe endpoint
+              requests the single hour `start`.
         """
         frequency = "hourly"  # always hourly
         len_str = ""
@@ -146,8 +219,8 @@ class EIAPolarClient:
         # Create string var for facet or extract info from the list
         facet_str = self.__concat_facets_string(facets=facets)
 
-        # Build probe endpoint, i.e. probe url
-        df_end_probe = start + datetime.timedelta(hours=1)
+        # Build probe endpoint, i.e. probe url (start and end are inclusive: a single hour)
+        df_end_probe = start
         probe_endpoint = (
             self.BASE_URL
             + api_path
@@ -163,37 +236,25 @@ class EIAPolarClient:
 
         return probe_endpoint
 
-    def __generate_endpoint_chunks(
-        self, api_path, facets, start, end, max_rows_request, n_timeseries
+    def __generate_chunk_windows(
+        self, start, end, max_rows_request, n_timeseries
     ) -> list:
         """
-        Splits a time range into chunks and generates API endpoint URLs for each chunk.
-        This method divides a specified time range into smaller chunks if the range exceeds
-        a predefined limit max_row_request (~4000 hours = rows). It then constructs API endpoint URLs for each chunk
-        based on the provided parameters.
-
+        Splits a time range into chunks of at most max_rows_request rows (~4000 hours = rows)
+        given the number of time series in the payload.
         Args:
-            api_path (str): The API path to be appended to the base URL.
-            facets (dict): A dictionary of facets to filter the API request. Each key represents
-                a facet name, and the value can be a string or a list of strings.
             start (datetime): The start of the time range.
             end (datetime): The end of the time range.
-
+            max_rows_request (int): Maximum number of rows per request.
+            n_timeseries (int): Number of time series returned per hour.
         Returns:
-            list: A list of strings, where each string is an API endpoint URL for a specific
-            time chunk. The first element is the probe endpoint URL.
+            list: A list of (start, end) datetime tuples, both ends inclusive.
         """
         chunk_size = ceil(max_rows_request / n_timeseries)
 
         if chunk_size % 2 != 0:  # Check if it's odd
             chunk_size += 1
 
-        frequency = "hourly"  # always hourly
-        len_str = ""
-        freq_str = "&frequency=" + frequency
-        # Create string var for facet or extract info from the list
-        facet_str = self.__concat_facets_string(facets=facets)
-
         # Initialize DataFrame
         df = pl.DataFrame().with_columns(
             period=pl.datetime_range(
@@ -212,24 +273,87 @@ class EIAPolarClient:
             dt_starts.append(df["period"][0])
             dt_ends.append(df["period"][-1])
 
+        return list(zip(dt_starts, dt_ends))
+
+    def __generate_aligned_chunk_windows(
+        self, start, end, max_rows_request, n_timeseries
+    ) -> list:
+        """
+        Like __generate_chunk_windows, but the windows lie on a fixed grid of chunk_size hours counted
+        from 1970-01-01T00 (UTC), so refreshes of moving ranges request the same windows again.
+        The first window is cut at start and the last one at end, so no hour outside start..end is
+        requested.
+        Returns:
+            list: A list of (start, end) datetime tuples, both ends inclusive.
+        """
+        chunk_size = ceil(max_rows_request / n_timeseries)
+
+        if chunk_size % 2 != 0:  # Check if it's odd
+            chunk_size += 1
+
+        origin = datetime.datetime(1970, 1, 1)
+        one_hour = datetime.timedelta(hours=1)
+        n_chunks_before = int((start - origin) / one_hour) // chunk_size
+        dt_start = origin + n_chunks_before * chunk_size * one_hour
+
+        windows = []
+        while dt_start <= end:
+            dt_end = min(dt_start + (chunk_size - 1) * one_hour, end)
+            windows.append((max(dt_start, start), dt_end))
+            dt_start += chunk_size * one_hour
+
+        return windows
+
+    def __generate_endpoint(self, api_path, facets, start, end) -> str:
+        """
+        Builds the API endpoint URL of a single chunk.
+        Args:
+            api_path (str): The API path to be appended to the base URL.
+            facets (dict): A dictionary of facets to filter the API request.
+            start (datetime): The first hour of the chunk.
+            end (datetime): The last hour of the chunk (inclusive).
+        Returns:
+            str: The endpoint URL.
+        """
+        frequency = "hourly"  # always hourly
+        len_str = ""
+        freq_str = "&frequency=" + frequency
+        # Create string var for facet or extract info from the list
+        facet_str = self.__concat_facets_string(facets=facets)
+
+        start_str = "&start=" + start.strftime("%Y-%m-%dT%H")  # Format: # 2024-01-01T01
+        end_str = "&end=" + end.strftime("%Y-%m-%dT%H")
+
+        return (
+            self.BASE_URL
+            + api_path
+            + "?data[]=value"
+            + facet_str
+            + start_str
+            + end_str
+            + len_str
+            + freq_str
+        )
+
+    def __generate_endpoint_chunks(self, api_path, facets, windows) -> list:
+        """
+        Generates API endpoint URLs for each chunk (time window) of the request.
+
+        Args:
+            api_path (str): The API path to be appended to the base URL.
+            facets (dict): A dictionary of facets to filter the API request. Each key represents
+                a facet name, and the value can be a string or a list of strings.
+            windows (list): The (start, end) tuples from __generate_chunk_windows.
+
+        Returns:
+            list: A list of strings, where each string is an API endpoint URL for a specific
+            time chunk.
+        """
         # Build list of endpoints for each chunk
-        endpoints = []
-        for i in range(len(dt_starts)):
-            start_str = "&start=" + dt_starts[i].strftime(
-                "%Y-%m-%dT%H"
-            )  # Format: # 2024-01-01T01
-            end_str = "&end=" + dt_ends[i].strftime("%Y-%m-%dT%H")
-
-            endpoints.append(
-                self.BASE_URL
-                + api_path
-                + "?data[]=value"
-                + facet_str
-                + start_str
-                + end_str
-                + len_str
-                + freq_str
-            )
+        endpoints = [
+            self.__generate_endpoint(api_path, facets, dt_start, dt_end)
+            for dt_start, dt_end in windows
+        ]
 
         # Display the number of chunks and the endpoints
         n_chunks = len(endpoints)
@@ -239,7 +363,7 @@ class EIAPolarClient:
             )
             for endpoint in endpoints:
                 print(endpoint)
-        else:
+        elif n_chunks == 1:
             print("\nRequesting the following endpoint:\n")
             print(endpoints[0])
 
@@ -258,8 +382,131 @@ class EIAPolarClient:
         )
         return df.sort("period")
 
+    def __get_data_with_store(
+        self, api_path, facets, windows, n_timeseries
+    ) -> pl.DataFrame:
+        """
+        Assemble the chunks (time windows) from the chunk store, requesting only the missing ones
+        from the API. Fetched chunks are formatted one by one and persisted for the next reload.
+        Args:
+            api_path (str): The API path to be appended to the base URL.
+            facets (dict): A dictionary of facets to filter the API request.
+            windows (list): The (start, end) tuples from __generate_chunk_windows.
+            n_timeseries (int): Rows per hour, so only fully covered hours are stored.
+        Returns:
+            pl.DataFrame: The formatted DataFrame sorted by period.
+        Raises:
+            ValueError: If the resulting DataFrame is empty, indicating no data was retrieved.
+        """
+        chunks = [self.chunk_store.get(api_path, facets, w[0], w[1]) for w in windows]
+        missing = [i for i, chunk in enumerate(chunks) if chunk is None]
+        print(
+            f"\nChunks served from the store: {len(windows) - len(missing)}/{len(windows)}"
+        )
+
+        missing_windows = [windows[i] for i in missing]
+        self.__generate_endpoint_chunks(api_path, facets, missing_windows)
+        for i, df_chunk in zip(
+            missing, self.__get_chunks_as_dfs(api_path, facets, missing_windows)
+        ):
+            if df_chunk.is_empty():
+                continue  # Nothing to store, e.g. future hours
+            chunks[i] = df_chunk
+            self.chunk_store.put(
+                chunks[i], api_path, facets, windows[i][0], windows[i][1], n_timeseries
+            )
+
+        chunks = [
+            chunk for chunk in chunks if chunk is not None and not chunk.is_empty()
+        ]
+        if not chunks:
+            raise ValueError(
+                "The DataFrame is empty. No data was retrieved from the API."
+            )
+
+        # Windows are disjoint and ordered, hence the concatenation is already sorted
+        df = pl.concat(chunks, rechunk=False)
+        return df.with_columns(pl.col("period").set_sorted())
+
+    def __get_data_adaptively(
+        self, api_path, facets, start, end, n_timeseries, controller
+    ) -> pl.DataFrame:
+        """
+        Fetch the time range with adaptive chunk widths and hedged requests (see adaptive.py).
+        Fetched chunks are persisted in the chunk store, if any.
+        Returns:
+            pl.DataFrame: The formatted DataFrame sorted by period.
+        Raises:
+            requests.exceptions.RequestException: If a chunk keeps failing.
+            ValueError: If the resulting DataFrame is empty, indicating no data was retrieved.
+        """
+
+        # Hedged requests duplicate slow chunks on purpose, so they bypass the coalescing
+        def fetch_window(dt_start, dt_end) -> pl.DataFrame:
+            return self.__fetch_window_uncoalesced(api_path, facets, dt_start, dt_end)
+
+        chunks = fetch_adaptively(fetch_window, start, end, n_timeseries, controller)
+        print(f"\nAdaptive fetch of {len(chunks)} chunks: {controller}")
+
+        # The chunks are disjoint and ordered, so the concatenation is sorted
+        list_with_dfs = []
+        for dt_start, dt_end, df_chunk in chunks:
+            if df_chunk.is_empty():
+                continue
+            if self.chunk_store is not None:
+                self.chunk_store.put(
+                    df_chunk, api_path, facets, dt_start, dt_end, n_timeseries
+                )
+            list_with_dfs.append(df_chunk)
+
+        if not list_with_dfs:
+            raise ValueError(
+                "The DataFrame is empty. No data was retrieved from the API."
+            )
+
+        df = pl.concat(list_with_dfs)
+        return df.with_columns(pl.col("period").set_sorted())
+
     # Helper Method
 
+    def __upsert_duckdb(
+        self, con, df: pl.DataFrame, table_name: str, rollups: Optional[tuple]
+    ) -> None:
+        """
+        Create the table from df, or upsert df into it, then refresh the rollup tables: the requested
+        ones and those already in the file. See save_df_as_duckdb.
+        """
+        from .rollups import ROLLUP_SOURCES, DuckDBRollups
+
+        table_exists = con.execute(
+            "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?",
+            [table_name],
+        ).fetchone()[0]
+
+        if not table_exists:
+            query = f"CREATE TABLE {table_name} AS SELECT * FROM df"
+            con.execute(query)
+        else:
+            keys = [col for col in df.columns if col != "value"]
+            match = " AND ".join(f't."{k}" IS NOT DISTINCT FROM df."{k}"' for k in keys)
+            con.execute("BEGIN TRANSACTION")
+            con.execute(f"DELETE FROM {table_name} t USING df WHERE {match}")
+            con.execute(f"INSERT INTO {table_name} BY NAME SELECT * FROM df")
+            con.execute("COMMIT")
+
+        # Rollup tables already in the file are refreshed too, else they would go stale
+        existing = tuple(
+            grain
+            for grain in ROLLUP_SOURCES
+            if con.execute(
+                "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?",
+                [f"{table_name}_{grain}"],
+            ).fetchone()[0]
+        )
+        grains = tuple(set(rollups or ()) | set(existing))
+        if grains:
+            DuckDBRollups(con, table_name, grains).refresh(df)
+
     def __concat_facets_string(self, facets: dict = None) -> str:
         """Concatenates facet parameters into a URL query string.
         Args:
@@ -294,6 +541,10 @@ class EIAPolarClient:
     # ================================================
     # Public Methods
     # ================================================
+    def close(self) -> None:
+        """Close the connections of the transport."""
+        self.transport.close()
+
     def get_eia_hourly_data(
         self,
         api_path: str,
@@ -301,11 +552,17 @@ class EIAPolarClient:
         start: datetime.datetime = None,
         end: datetime.datetime = None,
         max_rows_request: int = 4000,
+        adaptive: Union[bool, AdaptiveController] = False,
     ) -> pl.DataFrame:
         """
         This method first extracts the number of time series to be requested using a probing
         endpoint with one hour of data. This depends on the selected facest/filters by the user.
         Then it request chunks in parallel.
+        With adaptive=True (or an AdaptiveController to tune it), the chunk width and the concurrency
+        are adapted from the observed latency and errors, starting at max_rows_request rows per
+        request, and the slowest chunks are hedged with a duplicate request.
+        With a chunk store, the stored chunks are served without any request; recent chunks, which EIA
+        may still revise, expire after the max_age of the store (see ArrowChunkStore).
         """
         # ===== Check input parameters =====
         if not isinstance(api_path, str):
@@ -321,20 +578,35 @@ class EIAPolarClient:
             raise TypeError("end must be a datetime")
         # ===================================
 
+        # Serve the whole range from memory-mapped chunks if they cover it (no probe needed)
+        if self.chunk_store is not None:
+            df = self.chunk_store.get(api_path, facets, start, end)
+            if df is not None:
+                print(f"\nServing {df.height} rows from the {self.chunk_store}")
+                return df
+
         # Probe data to check number of time series in the payload
         probe_endpoint = self.__generate_probe_endpoint(api_path, facets, start, end)
         n_ts = self.__probe_data(endpoint_url=probe_endpoint)
 
-        # Generate the [list] of endpoints urls to be requested
-        endpoints = self.__generate_endpoint_chunks(
-            api_path, facets, start, end, max_rows_request, n_timeseries=n_ts
-        )
+        if adaptive:
+            if not isinstance(adaptive, AdaptiveController):
+                adaptive = AdaptiveController(rows_per_request=max_rows_request)
+            return self.__get_data_adaptively(
+                api_path, facets, start, end, n_ts, adaptive
+            )
+
+        # Split the requested range in chunks (time windows)
+        windows = self.__generate_chunk_windows(start, end, max_rows_request, n_ts)
 
-        # Get the data from the API
-        df = self.__get_data_as_df(endpoints)
+        if self.chunk_store is not None:
+            return self.__get_data_with_store(api_path, facets, windows, n_ts)
 
-        # Format the columns and sort the DataFrame
-        df = self.__format_df_columns(df)
+        # Display the [list] of endpoints urls to be requested
+        self.__generate_endpoint_chunks(api_path, facets, windows)
+
+        # Get the data from the API, formatted and sorted
+        df = self.__get_data_as_df(api_path, facets, windows)
 
         # TODO: Add method to store df metadata in a duckdb (e.g. facets, start, end, etc.)
         # df.metadata = {"facets": facets, "start": start, "end": end}
@@ -343,19 +615,346 @@ class EIAPolarClient:
 
         return df
 
+    def get_eia_hourly_aligned(
+        self,
+        specs: dict,
+        start: datetime.datetime = None,
+        end: datetime.datetime = None,
+        max_rows_request: int = 4000,
+        path: Optional[str] = None,
+        table_name: str = "eia_aligned",
+    ) -> pl.DataFrame:
+        """
+        Fetch several routes (e.g. demand, generation by fuel type and interchange) in one call and
+        align them on the hourly period grid start..end.
+        Every spec is probed, then the chunks of all the specs are requested through one shared thread
+        pool. The result has a period column and one value column per series, namespaced by spec name
+        and named after the series columns the facets leave open (see aligned.align_hourly), e.g.
+        "demand.SDGE" for {"parent": "CISO"} or "generation.NG" for {"respondent": "CISO"}.
+        Args:
+            specs (dict): {name: {"api_path": str, "facets": dict or None}}.
+            path (str, optional): DuckDB file to also write the aligned frame to, as table_name.
+        Returns:
+            pl.DataFrame: The wide DataFrame sorted by period.
+        Raises:
+            ValueError: If two series get the same column name.
+        """
+        # ===== Check input parameters =====
+        if not isinstance(specs, dict) or not specs:
+            raise TypeError("specs must be a non-empty dictionary of {name: spec}")
+
+        for name, spec in specs.items():
+            if not isinstance(spec, dict) or not isinstance(spec.get("api_path"), str):
+                raise TypeError(
+                    f"spec {name!r} must be a dictionary with an api_path string"
+                )
+            if spec.get("facets") is not None and not isinstance(spec["facets"], dict):
+                raise TypeError(f"facets of spec {name!r} must be a dictionary or None")
+
+        if not isinstance(start, datetime.datetime):
+            raise TypeError("start must be a datetime")
+
+        if not isinstance(end, datetime.datetime):
+            raise TypeError("end must be a datetime")
+        # ===================================
+
+        def probe(spec) -> int:
+            probe_endpoint = self.__generate_probe_endpoint(
+                spec["api_path"], spec.get("facets"), start, end
+            )
+            return self.__probe_data(endpoint_url=probe_endpoint)
+
+        with ThreadPoolExecutor() as executor:
+            n_ts = dict(zip(specs, executor.map(probe, specs.values())))
+
+            # One task per (spec, window): the chunks of every route share the pool
+            tasks = [
+                (name, window)
+                for name, spec in specs.items()
+                for window in self.__generate_chunk_windows(
+                    start, end, max_rows_request, n_ts[name]
+                )
+            ]
+            print(f"\nRequesting {len(tasks)} chunks of {len(specs)} routes")
+            chunks = list(
+                executor.map(
+                    lambda task: self.__fetch_window(
+                        specs[task[0]]["api_path"],
+                        specs[task[0]].get("facets"),
+                        *task[1],
+                    ),
+                    tasks,
+                )
+            )
+
+        # Windows are disjoint and ordered per spec, hence each concatenation is sorted
+        dfs = {}
+        for name in specs:
+            list_with_dfs = [
+                df
+                for (task_name, _), df in zip(tasks, chunks)
+                if task_name == name and not df.is_empty()
+            ]
+            dfs[name] = pl.concat(list_with_dfs) if list_with_dfs else pl.DataFrame()
+
+        facets = {name: spec.get("facets") for name, spec in specs.items()}
+        df = align_hourly(dfs, start, end, facets=facets)
+
+        if path is not None:
+            import duckdb  # Deferred: only the DuckDB sink needs it
+
+            con = duckdb.connect(path)
+            try:
+                con.execute(f"CREATE OR REPLACE TABLE {table_name} AS SELECT * FROM df")
+            finally:
+                con.close()
+
+        return df
+
+    def plan(
+        self,
+        api_path: str,
+        facets: Optional[dict] = None,
+        start: datetime.datetime = None,
+        end: datetime.datetime = None,
+        max_rows_request: int = 4000,
+        concurrency: Optional[int] = None,
+        rate_limit: Optional[float] = None,
+    ) -> QueryPlan:
+        """
+        Dry run of get_eia_hourly_data: probe the API (a single hour) and return the chunk plan with
+        the estimated rows, response bytes, peak memory and duration, calibrated from the requests
+        recorded in self.request_stats (see RequestStats.save/load to reuse them across processes).
+        Args:
+            concurrency (int, optional): Concurrent requests, defaults to the thread pool's default.
+            rate_limit (float, optional): Requests per second allowed, defaults to the key pool budget.
+        Returns:
+            QueryPlan: The structured plan, print it for a summary.
+        """
+        # ===== Check input parameters =====
+        if not isinstance(api_path, str):
+            raise TypeError("api_path must be a string")
+
+        if facets is not None and not isinstance(facets, dict):
+            raise TypeError("facets must be a dictionary or None")
+
+        if not isinstance(start, datetime.datetime):
+            raise TypeError("start must be a datetime")
+
+        if not isinstance(end, datetime.datetime):
+            raise TypeError("end must be a datetime")
+        # ===================================
+
+        if concurrency is None:
+            concurrency = min(
+                32, (os.cpu_count() or 1) + 4
+            )  # ThreadPoolExecutor default
+        if rate_limit is None and isinstance(self.api_key, APIKeyPool):
+            rate_limit = sum(key["rate_per_second"] for key in self.api_key.keys)
+
+        probe_endpoint = self.__generate_probe_endpoint(api_path, facets, start, end)
+        n_ts = self.__probe_data(endpoint_url=probe_endpoint)
+        windows = self.__generate_chunk_windows(start, end, max_rows_request, n_ts)
+        urls = [self.__generate_endpoint(api_path, facets, w[0], w[1]) for w in windows]
+
+        return build_plan(
+            api_path,
+            facets,
+            start,
+            end,
+            n_timeseries=n_ts,
+            max_rows_request=max_rows_request,
+            windows=windows,
+            urls=urls,
+            stats=self.request_stats,
+            concurrency=concurrency,
+            rate_limit=rate_limit,
+        )
+
+    def get_chunk_windows(
+        self,
+        api_path: str,
+        facets: Optional[dict] = None,
+        start: datetime.datetime = None,
+        end: datetime.datetime = None,
+        max_rows_request: int = 4000,
+    ) -> list:
+        """
+        Probe the API and split the time range in the chunks get_eia_hourly_data would request.
+        Returns:
+            list: A list of (start, end) datetime tuples, both ends inclusive.
+        """
+        return self.plan(api_path, facets, start, end, max_rows_request).windows
+
+    def fetch_chunk(
+        self,
+        api_path: str,
+        facets: Optional[dict],
+        start: datetime.datetime,
+        end: datetime.datetime,
+    ) -> pl.DataFrame:
+        """
+        Request a single chunk, i.e. the hours start..end (inclusive), without probing nor splitting.
+        Returns:
+            pl.DataFrame: The formatted DataFrame sorted by period (empty if there is no data).
+        """
+        return self.__fetch_window(api_path, facets, start, end)
+
     def save_df_as_duckdb(
         self,
         df: pl.DataFrame,
         path: str = "./data/raw/eia_data.duckdb",
         table_name: str = "eia_data",
+        rollups: Optional[tuple] = ("daily", "weekly", "monthly", "yearly"),
     ) -> None:
         """
         Save a Polars DataFrame with the requested EIA data to a DuckDB file.
         Ideal for large dynamic (updatable) dataset and quick data analysis.
+        If the table already exists, the rows are upserted: hours already stored for the same
+        series are replaced (i.e. revised) and new hours appended. The rollup tables
+        <table_name>_<grain> are then refreshed only for the buckets touched by df.
+        rollups=None creates no rollup table, but those already in the file are still refreshed.
         """
-        query = f"CREATE TABLE {table_name} AS SELECT * FROM df"
+        import duckdb  # Deferred: only the DuckDB sink needs it
+
         con = duckdb.connect(path)
-        con.execute(query)
-        con.close()
+        try:
+            self.__upsert_duckdb(con, df, table_name, rollups)
+        finally:
+            con.close()
 
         return None
+
+    def refresh_duckdb(
+        self,
+        api_path: str,
+        facets: Optional[dict] = None,
+        start: datetime.datetime = None,
+        end: datetime.datetime = None,
+        path: str = "./data/raw/eia_data.duckdb",
+        table_name: str = "eia_data",
+        max_rows_request: int = 4000,
+        rollups: Optional[tuple] = ("daily", "weekly", "monthly", "yearly"),
+    ) -> pl.DataFrame:
+        """
+        Refetch the hours start..end (e.g. the last days, to pick up EIA revisions) into a DuckDB file
+        written by save_df_as_duckdb, rewriting only what changed.
+        Chunks lie on a fixed grid (see __generate_aligned_chunk_windows) and the raw rows of each one
+        are fingerprinted. The fingerprints are kept in <table_name>_chunk_hashes, so chunks identical
+        to the last refresh are dropped before formatting. Of the changed chunks, only the new or
+        revised rows are upserted.
+        Returns:
+            pl.DataFrame: The upserted rows (empty if nothing changed).
+        """
+        # ===== Check input parameters =====
+        if not isinstance(api_path, str):
+            raise TypeError("api_path must be a string")
+
+        if facets is not None and not isinstance(facets, dict):
+            raise TypeError("facets must be a dictionary or None")
+
+        if not isinstance(start, datetime.datetime):
+            raise TypeError("start must be a datetime")
+
+        if not isinstance(end, datetime.datetime):
+            raise TypeError("end must be a datetime")
+        # ===================================
+
+        import duckdb  # Deferred: only the DuckDB sink needs it
+
+        from .chunk_hashes import DuckDBChunkHashes, fingerprint_rows
+
+        probe_endpoint = self.__generate_probe_endpoint(api_path, facets, start, end)
+        n_ts = self.__probe_data(endpoint_url=probe_endpoint)
+        windows = self.__generate_aligned_chunk_windows(
+            start, end, max_rows_request, n_ts
+        )
+
+        def fetch_rows(window) -> list:
+            endpoint = self.__generate_endpoint(api_path, facets, window[0], window[1])
+            return self.__fetch_data(endpoint, {"api_key": self.api_key})["response"][
+                "data"
+            ]
+
+        with ThreadPoolExecutor() as executor:
+            chunks_rows = list(executor.map(fetch_rows, windows))
+        fingerprints = [fingerprint_rows(rows) for rows in chunks_rows]
+
+        key = series_key(api_path, facets)
+        con = duckdb.connect(path)
+        try:
+            con.execute("SET TimeZone = 'UTC'")
+            table_exists = con.execute(
+                "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?",
+                [table_name],
+            ).fetchone()[0]
+            chunk_hashes = DuckDBChunkHashes(con, table_name)
+            stored = chunk_hashes.get(key) if table_exists else {}
+            changed = [
+                i for i, w in enumerate(windows) if stored.get(w) != fingerprints[i]
+            ]
+            print(
+                f"\n{len(windows) - len(changed)} of {len(windows)} chunks unchanged since the last refresh"
+            )
+
+            list_with_dfs = [
+                self.__format_df_columns(pl.DataFrame(chunks_rows[i]))
+                for i in changed
+                if chunks_rows[i]
+            ]
+            df = pl.concat(list_with_dfs) if list_with_dfs else pl.DataFrame()
+
+            if table_exists and not df.is_empty():
+                # Keep the rows not stored as is, i.e. new hours and revised values
+                match = " AND ".join(
+                    f'df."{col}" IS NOT DISTINCT FROM t."{col}"' for col in df.columns
+                )
+                df = con.execute(
+                    f"SELECT df.* FROM df ANTI JOIN {table_name} t ON {match} ORDER BY df.period"
+                ).pl()
+
+            if not df.is_empty():
+                self.__upsert_duckdb(con, df, table_name, rollups)
+            print(f"{df.height} rows upserted into {table_name}")
+
+            # Recorded once the rows are written, so a failed refresh is redone next time
+            chunk_hashes.put(
+                key,
+                [(*windows[i], fingerprints[i], len(chunks_rows[i])) for i in changed],
+            )
+        finally:
+            con.close()
+
+        return df
+
+    def query_duckdb_rollup(
+        self,
+        grain: str,
+        path: str = "./data/raw/eia_data.duckdb",
+        table_name: str = "eia_data",
+        start: Optional[datetime.datetime] = None,
+        end: Optional[datetime.datetime] = None,
+    ) -> pl.DataFrame:
+        """
+        Get SUM(value) per series and "daily", "weekly", "monthly" or "yearly" bucket from a DuckDB
+        file written by save_df_as_duckdb, served from the cheapest rollup table available.
+        """
+        import duckdb  # Deferred: only the DuckDB sink needs it
+
+        from .rollups import DuckDBRollups
+
+        con = duckdb.connect(path, read_only=True)
+        try:
+            grains = tuple(
+                g
+                for g in ("daily", "weekly", "monthly", "yearly")
+                if con.execute(
+                    "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?",
+                    [f"{table_name}_{g}"],
+                ).fetchone()[0]
+            )
+            df = DuckDBRollups(con, table_name, grains).query(grain, start, end)
+        finally:
+            con.close()
+
+        return df
@@ -0,0 +1,165 @@
+"""
+This module contains the APIKeyPool class, a pool of EIA API keys with a rate budget (token bucket)
+and a health state per key. Requests are spread across the keys, and keys answering 429 (rate limited)
+or 403 (forbidden) are benched for a while, so the aggregate throughput scales with the number of keys.
+"""
+
+import threading
+import time
+from typing import Callable, Optional, Union
+
+BENCH_STATUS_CODES = (403, 429)
+
+
+class APIKeyPool:
+    """
+    Each key is a dict, or a plain string using the default budget:
+        {"key": "...", "rate_per_second": 2.0, "burst": 5}
+    A key is acquired when it has a token in its bucket and is not benched. A benched key gets
+    back in the pool after bench_seconds, doubled at each consecutive strike (up to max_bench_seconds).
+    """
+
+    def __init__(
+        self,
+        keys: list,
+        rate_per_second: float = 2.5,  # ~9000 requests per hour
+        burst: int = 5,
+        bench_seconds: float = 30.0,
+        max_bench_seconds: float = 900.0,
+    ):
+        if not keys:
+            raise ValueError("keys must contain at least one API key")
+        self.bench_seconds = bench_seconds
+        self.max_bench_seconds = max_bench_seconds
+        now = time.monotonic()
+        self.keys = []
+        for key in keys:
+            key = {"key": key} if isinstance(key, str) else dict(key)
+            key.setdefault("rate_per_second", rate_per_second)
+            key.setdefault("burst", burst)
+            key.update(
+                tokens=float(key["burst"]),
+                updated=now,
+                benched_until=0.0,
+                strikes=0,
+                n_requests=0,
+            )
+            self.keys.append(key)
+        self.__next = 0
+        self.__cond = threading.Condition()
+
+    def __str__(self) -> str:
+        return f"Pool of {len(self.keys)} EIA API keys"
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    # ================================================
+    # Private Methods
+    # ================================================
+    def __refill(self, key: dict, now: float) -> None:
+        key["tokens"] = min(
+            key["burst"],
+            key["tokens"] + (now - key["updated"]) * key["rate_per_second"],
+        )
+        key["updated"] = now
+
+    def __find(self, api_key: str) -> dict:
+        return next(key for key in self.keys if key["key"] == api_key)
+
+    # ================================================
+    # Public Methods
+    # ================================================
+    def acquire(self, timeout: Optional[float] = None) -> str:
+        """
+        Take a token from the next healthy key with budget left (round-robin), waiting if needed.
+        Returns:
+            str: The API key.
+        Raises:
+            TimeoutError: If no key is available within timeout seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.__cond:
+            while True:
+                now = time.monotonic()
+                wait_for = self.max_bench_seconds
+                for i in range(len(self.keys)):
+                    key = self.keys[(self.__next + i) % len(self.keys)]
+                    if key["benched_until"] > now:
+                        wait_for = min(wait_for, key["benched_until"] - now)
+                        continue
+                    self.__refill(key, now)
+                    if key["tokens"] >= 1.0:
+                        key["tokens"] -= 1.0
+                        key["n_requests"] += 1
+                        self.__next = (self.__next + i + 1) % len(self.keys)
+                        return key["key"]
+                    wait_for = min(
+                        wait_for, (1.0 - key["tokens"]) / key["rate_per_second"]
+                    )
+
+                if deadline is not None:
+                    if now >= deadline:
+                        raise TimeoutError(
+                            "No EIA API key available within the timeout"
+                        )
+                    wait_for = min(wait_for, deadline - now)
+                self.__cond.wait(wait_for)
+
+    def bench(self, api_key: str) -> None:
+        """Take a key out of the pool after a 429/403, for an exponentially growing period."""
+        with self.__cond:
+            key = self.__find(api_key)
+            period = min(
+                self.bench_seconds * 2 ** key["strikes"], self.max_bench_seconds
+            )
+            key["strikes"] += 1
+            key["benched_until"] = time.monotonic() + period
+            print(f"API key ...{api_key[-4:]} benched for {period:.0f} s")
+
+    def report_success(self, api_key: str) -> None:
+        """A successful request clears the strikes of a key."""
+        with self.__cond:
+            self.__find(api_key)["strikes"] = 0
+
+    def healthy_keys(self) -> list:
+        """Keys not benched at the moment."""
+        now = time.monotonic()
+        return [key["key"] for key in self.keys if key["benched_until"] <= now]
+
+    def request(
+        self, send: Callable, url: str, params: dict, max_attempts: Optional[int] = None
+    ):
+        """
+        Send a request with a key of the pool, retrying with another key when the key is rate
+        limited or forbidden (429/403).
+        Args:
+            send (Callable): Function (url, params) -> requests.Response, e.g. a transport.Transport.
+            url (str): The API endpoint URL.
+            params (dict): Query parameters, the api_key is set by the pool.
+            max_attempts (int, optional): Defaults to twice the number of keys.
+        Returns:
+            requests.Response: The first response not rate limited nor forbidden.
+        Raises:
+            requests.exceptions.HTTPError: The last 429/403 if every attempt failed.
+        """
+        max_attempts = max_attempts or 2 * len(self.keys)
+        for _ in range(max_attempts):
+            api_key = self.acquire()
+            response = send(url, {**params, "api_key": api_key})
+            if response.status_code not in BENCH_STATUS_CODES:
+                if response.ok:
+                    self.report_success(api_key)
+                return response
+            self.bench(api_key)
+        response.raise_for_status()
+        return response
+
+
+def as_key_pool(
+    api_key: Union[str, list, APIKeyPool, None],
+) -> Union[str, APIKeyPool, None]:
+    """A list (or tuple) of keys becomes an APIKeyPool; a single key or a pool is kept as is."""
+    if isinstance(api_key, (list, tuple)):
+        return APIKeyPool(list(api_key))
+    return api_key
@@ -0,0 +1,248 @@
+"""
+This module contains the LiveTail class, a tail-follow mode for real-time grid monitoring
+(e.g. electricity/rto/... routes). It keeps the recent hours of each series in a fixed-size, array-backed
+ring buffer, and each poll requests only the newest hours plus a short revision overlap, so the polling
+cost does not depend on the window displayed.
+"""
+
+import datetime
+import threading
+from typing import Callable, Optional
+
+import numpy as np
+import polars as pl
+
+EPOCH = datetime.datetime(1970, 1, 1)
+ONE_HOUR = datetime.timedelta(hours=1)
+
+
+class SeriesRingBuffer:
+    """
+    The last `capacity` hours of one series in two numpy arrays, indexed by hour % capacity.
+    Writing an hour (new or revised) is O(1) and in place; older hours are overwritten as time moves on.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.hours = np.full(
+            capacity, -1, dtype=np.int64
+        )  # Hour stored in each slot (-1: empty)
+        self.values = np.full(capacity, np.nan, dtype=np.float64)
+        self.latest_hour = -1
+
+    def update(self, hours: np.ndarray, values: np.ndarray) -> np.ndarray:
+        """
+        Write hours (since the epoch) and their values in place.
+        Returns:
+            np.ndarray: Boolean mask of the rows that were new or revised.
+        """
+        latest_hour = max(self.latest_hour, int(hours.max()))
+        in_window = hours > latest_hour - self.capacity
+        slots = hours % self.capacity
+        is_new = self.hours[slots] != hours
+        old_values = self.values[slots]
+        is_revised = ~is_new & ~(
+            (old_values == values) | (np.isnan(old_values) & np.isnan(values))
+        )
+        changed = in_window & (is_new | is_revised)
+
+        self.hours[slots[changed]] = hours[changed]
+        self.values[slots[changed]] = values[changed]
+        self.latest_hour = latest_hour
+        return changed
+
+    def window(self) -> tuple:
+        """
+        The buffered hours in chronological order.
+        Returns:
+            tuple: (hours, values) numpy arrays of length capacity, NaN where an hour is missing.
+        """
+        hours = np.arange(
+            self.latest_hour - self.capacity + 1, self.latest_hour + 1, dtype=np.int64
+        )
+        slots = hours % self.capacity
+        values = np.where(self.hours[slots] == hours, self.values[slots], np.nan)
+        return hours, values
+
+
+class LiveTail:
+    """
+    Follow the newest hours of an EIA route. Usage:
+
+        tail = LiveTail(client, "electricity/rto/region-sub-ba-data/data/", {"parent": "CISO"}, window_hours=168)
+        tail.subscribe(lambda deltas: print(deltas))
+        tail.start()           # one full request of the window
+        tail.poll()            # then only the newest hours + overlap_hours, every few minutes
+        df = tail.to_polars()  # the window, sorted by period
+    """
+
+    def __init__(
+        self,
+        client,
+        api_path: str,
+        facets: Optional[dict] = None,
+        window_hours: int = 168,
+        overlap_hours: int = 3,
+        max_rows_request: int = 4000,
+    ):
+        self.client = client
+        self.api_path = api_path
+        self.facets = facets
+        self.window_hours = window_hours
+        self.overlap_hours = overlap_hours
+        self.max_rows_request = max_rows_request
+        self.buffers = {}  # series key -> SeriesRingBuffer
+        self.series = {}  # series key -> dict with the series columns
+        self.columns = []  # Column order of the API data
+        self.subscribers = []
+        self.__lock = threading.Lock()
+
+    def __str__(self) -> str:
+        return f"Live tail of {self.api_path} ({len(self.buffers)} series, {self.window_hours} hours)"
+
+    # ================================================
+    # Private Methods
+    # ================================================
+    def __apply(self, df: pl.DataFrame) -> pl.DataFrame:
+        """Write the rows of a formatted DataFrame into the ring buffers, returning the changed rows."""
+        key_cols = [col for col in df.columns if col not in ("period", "value")]
+        self.columns = self.columns or df.columns
+        df = df.with_columns(
+            hour=(pl.col("period").dt.epoch("s") // 3600).cast(pl.Int64)
+        )
+        deltas = []
+        with self.__lock:
+            for key, df_series in df.group_by(key_cols, maintain_order=True):
+                if key not in self.buffers:
+                    self.buffers[key] = SeriesRingBuffer(self.window_hours)
+                    self.series[key] = dict(zip(key_cols, key))
+                changed = self.buffers[key].update(
+                    df_series["hour"].to_numpy(),
+                    df_series["value"].fill_null(np.nan).to_numpy(),
+                )
+                if changed.any():
+                    deltas.append(df_series.filter(pl.Series(changed)))
+
+        if not deltas:
+            return df.clear().drop("hour")
+        return pl.concat(deltas).drop("hour").sort("period")
+
+    def __notify(self, deltas: pl.DataFrame) -> None:
+        if deltas.is_empty():
+            return None
+        for callback in self.subscribers:
+            callback(deltas)
+
+    # ================================================
+    # Public Methods
+    # ================================================
+    def subscribe(self, callback: Callable) -> None:
+        """Register a callback called with a DataFrame of the new or revised rows after each update."""
+        self.subscribers.append(callback)
+
+    def start(self, now: Optional[datetime.datetime] = None) -> pl.DataFrame:
+        """
+        Fill the ring buffers with the last window_hours hours (one full request).
+        Args:
+            now (datetime, optional): Current time (naive, UTC), defaults to the system clock.
+        Returns:
+            pl.DataFrame: The rows written.
+        """
+        now = now or datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        end = now.replace(minute=0, second=0, microsecond=0)
+        start = end - ONE_HOUR * (self.window_hours - 1)
+        df = self.client.get_eia_hourly_data(
+            api_path=self.api_path,
+            facets=self.facets,
+            start=start,
+            end=end,
+            max_rows_request=self.max_rows_request,
+        )
+        deltas = self.__apply(df)
+        self.__notify(deltas)
+        return deltas
+
+    def poll(self, now: Optional[datetime.datetime] = None) -> pl.DataFrame:
+        """
+        Request the hours after the latest one received by every series, plus overlap_hours of possible
+        revisions (at most the last window_hours), and apply them in place. That is a single request,
+        unless the range holds more than max_rows_request rows (e.g. after a long pause): it is then
+        split in chunks by get_eia_hourly_data, so no response is truncated at the API row cap.
+        Args:
+            now (datetime, optional): Current time (naive, UTC), defaults to the system clock.
+        Returns:
+            pl.DataFrame: The new or revised rows (also sent to the subscribers).
+        """
+        if not self.buffers:
+            return self.start(now)
+
+        now = now or datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        end = now.replace(minute=0, second=0, microsecond=0)
+        # From the series lagging the most, so its missing hours are requested again
+        latest_hour = min(buffer.latest_hour for buffer in self.buffers.values())
+        start = EPOCH + ONE_HOUR * (latest_hour - self.overlap_hours + 1)
+        # After a long pause, only the window is needed
+        start = max(start, end - ONE_HOUR * (self.window_hours - 1))
+        end = max(start, end)
+
+        n_hours = int((end - start) / ONE_HOUR) + 1
+        if n_hours * len(self.buffers) > self.max_rows_request:
+            df = self.client.get_eia_hourly_data(
+                api_path=self.api_path,
+                facets=self.facets,
+                start=start,
+                end=end,
+                max_rows_request=self.max_rows_request,
+            )
+        else:
+            df = self.client.fetch_chunk(self.api_path, self.facets, start, end)
+        if df.is_empty():
+            return df
+        deltas = self.__apply(df)
+        self.__notify(deltas)
+        return deltas
+
+    def run(
+        self, interval_seconds: float = 300.0, stop: Optional[threading.Event] = None
+    ) -> None:
+        """Poll every interval_seconds until stop is set. Errors are printed and the polling goes on."""
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            try:
+                self.poll()
+            except Exception as error:
+                print(f"{self} poll failed: {error!r}")
+            stop.wait(interval_seconds)
+
+    def to_polars(self) -> pl.DataFrame:
+        """
+        The buffered window of every series, in the long format of get_eia_hourly_data
+        (missing hours are left out).
+        Returns:
+            pl.DataFrame: The window sorted by period.
+        """
+        with self.__lock:
+            list_with_dfs = []
+            for key, buffer in self.buffers.items():
+                hours, values = buffer.window()
+                df_series = pl.DataFrame({"hour": hours, "value": values}).filter(
+                    pl.col("value").is_not_nan()
+                )
+                list_with_dfs.append(
+                    df_series.with_columns(
+                        **{
+                            col: pl.lit(value)
+                            for col, value in self.series[key].items()
+                        }
+                    )
+                )
+
+        if not list_with_dfs:
+            return pl.DataFrame()
+
+        df = pl.concat(list_with_dfs).with_columns(
+            period=pl.from_epoch(pl.col("hour") * 3600, time_unit="s")
+            .cast(pl.Datetime("us"))
+            .dt.replace_time_zone("UTC")
+        )
+        return df.select(self.columns).sort("period")
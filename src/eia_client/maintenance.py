@@ -0,0 +1,442 @@
+"""
+This module contains the storage-layout maintenance of the local EIA store:
+- compact_duckdb: rewrite a DuckDB file written by save_df_as_duckdb into a new file with the EIA table
+  deduplicated (latest revision per series and hour) and sorted by period in full row groups, its rollups
+  rebuilt, the other tables (chunk hashes, ...) copied as is, statistics rebuilt, then swapped in atomically.
+- compact_parquet: merge many (small) Parquet files into one, deduplicated and sorted by period.
+- BackgroundMaintenance: run both on a schedule in a background thread.
+Both report the storage and the scan timings before and after.
+DuckDB locks a file per process: the initial checkpoint and the swap of the compacted file need the
+exclusive lock, so any connection held open by another process (read-only ones included) makes the
+compaction skip, and while the compaction holds the lock, other processes cannot connect. Readers of a
+compacted file should hence connect, query and close (e.g. a dashboard per refresh) rather than hold a
+connection. The copy in between only reads the file, so connections made then keep working.
+"""
+
+import glob
+import os
+import threading
+import time
+from typing import Optional
+
+import duckdb
+
+from .rollups import ROLLUP_SOURCES, DuckDBRollups
+
+ROW_GROUP_SIZE = 122_880  # DuckDB's row group size, also used for the Parquet outputs
+
+
+# ================================================
+# Helpers
+# ================================================
+def _sql_string(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _key_columns(
+    con: duckdb.DuckDBPyConnection, relation: str, exclude: tuple = ()
+) -> list:
+    """Columns identifying a row, i.e. all but value (as in the upserts of save_df_as_duckdb)."""
+    description = con.execute(f"SELECT * FROM {relation} LIMIT 0").description
+    return [
+        col[0] for col in description if col[0] != "value" and col[0] not in exclude
+    ]
+
+
+def _dedup_sorted_select(
+    con: duckdb.DuckDBPyConnection,
+    relation: str,
+    latest_first: str,
+    exclude: tuple = (),
+) -> str:
+    """
+    SELECT of the latest row per key (first in the latest_first ordering), sorted by period then series.
+    The exclude columns (e.g. ordering helpers) are neither keys nor selected.
+    """
+    keys = [f'"{k}"' for k in _key_columns(con, relation, exclude) if k != "period"]
+    partition = ", ".join(["period"] + keys)
+    excluded = ", ".join(["_rn"] + [f'"{col}"' for col in exclude])
+    return (
+        f"SELECT * EXCLUDE ({excluded}) FROM ("
+        f"SELECT *, ROW_NUMBER() OVER (PARTITION BY {partition} ORDER BY {latest_first}) AS _rn "
+        f"FROM {relation}) WHERE _rn = 1 "
+        f"ORDER BY {partition}"
+    )
+
+
+def _scan_timings(
+    con: duckdb.DuckDBPyConnection, relation: str, repeat: int = 3
+) -> dict:
+    """Best of repeat timings (ms) of typical analysis scans, e.g. analyse_data_with_duckdb.py."""
+    max_period = con.execute(
+        f"SELECT CAST(MAX(period) AS VARCHAR) FROM {relation}"
+    ).fetchone()[0]
+    queries = {
+        "full scan": f"SELECT SUM(value), COUNT(*) FROM {relation}",
+        "last 30 days": (
+            f"SELECT SUM(value) FROM {relation} "
+            f"WHERE period > CAST('{max_period}' AS TIMESTAMPTZ) - INTERVAL 30 DAY"
+        ),
+        "monthly sums": (
+            f"SELECT COUNT(*), SUM(total) FROM ("
+            f"SELECT date_trunc('month', period) AS month, SUM(value) AS total FROM {relation} GROUP BY month)"
+        ),
+    }
+    timings = {}
+    for name, query in queries.items():
+        best = float("inf")
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            con.execute(query).fetchall()
+            best = min(best, time.perf_counter() - start_time)
+        timings[f"{name} [ms]"] = best * 1000
+    return timings
+
+
+def _duckdb_stats(path: str, table_name: str) -> dict:
+    con = duckdb.connect(path, read_only=True)
+    try:
+        con.execute("SET TimeZone = 'UTC'")
+        stats = {
+            "file size [MB]": os.path.getsize(path) / 1e6,
+            "rows": con.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0],
+            "row groups": con.execute(
+                f"SELECT COUNT(DISTINCT row_group_id) FROM pragma_storage_info({_sql_string(table_name)})"
+            ).fetchone()[0],
+        }
+        stats.update(_scan_timings(con, table_name))
+    finally:
+        con.close()
+    return stats
+
+
+def _parquet_stats(source: str) -> dict:
+    files = sorted(glob.glob(source))
+    con = duckdb.connect()
+    try:
+        con.execute("SET TimeZone = 'UTC'")
+        relation = f"read_parquet({_sql_string(source)})"
+        stats = {
+            "files": len(files),
+            "size [MB]": sum(os.path.getsize(f) for f in files) / 1e6,
+            "rows": con.execute(f"SELECT COUNT(*) FROM {relation}").fetchone()[0],
+            "row groups": con.execute(
+                f"SELECT COUNT(*) FROM (SELECT DISTINCT file_name, row_group_id "
+                f"FROM parquet_metadata({_sql_string(source)}))"
+            ).fetchone()[0],
+        }
+        stats.update(_scan_timings(con, relation))
+    finally:
+        con.close()
+    return stats
+
+
+def print_report(title: str, before: dict, after: dict) -> None:
+    """Print the before/after stats of a compaction side by side."""
+    print(f"\n{title}")
+    print(f"{'':<22}{'before':>12}{'after':>12}")
+    for name, value in before.items():
+        fmt = ",.0f" if isinstance(value, int) else ",.2f"
+        print(f"{name:<22}{value:>12{fmt}}{after[name]:>12{fmt}}")
+
+
+# ================================================
+# Compaction
+# ================================================
+def compact_duckdb(
+    path: str = "./data/raw/eia_data.duckdb", table_name: str = "eia_data"
+) -> dict:
+    """
+    Rewrite a DuckDB file into large period-sorted row groups, without superseded rows, then swap it in.
+    The table_name table keeps the latest row per series and hour and its rollup tables are rebuilt from
+    it; the other tables are copied with their schema (constraints included). The swap is done holding
+    the writer lock, and aborted if the source changed while it was copied.
+    The checkpoint and the swap need the exclusive lock of the file, see the module docstring.
+    Returns:
+        dict: {"before": stats, "after": stats} with file size, rows, row groups and scan timings.
+    Raises:
+        FileNotFoundError: If path does not exist.
+        duckdb.IOException: If another process has the file open, read-only included (retry later).
+        RuntimeError: If the file was modified during the compaction.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+
+    # Fold the write-ahead log into the file, so it cannot be replayed onto the compacted file
+    con = duckdb.connect(path)
+    try:
+        con.execute("CHECKPOINT")
+    finally:
+        con.close()
+
+    before = _duckdb_stats(path, table_name)
+    source_stat = os.stat(path)
+
+    tmp_path = f"{path}.{os.getpid()}.compact"
+    for stale in (tmp_path, f"{tmp_path}.wal"):
+        if os.path.exists(stale):
+            os.remove(stale)
+
+    con = duckdb.connect()
+    try:
+        con.execute("SET TimeZone = 'UTC'")
+        con.execute(f"ATTACH {_sql_string(path)} AS src (READ_ONLY)")
+        con.execute(f"ATTACH {_sql_string(tmp_path)} AS dst")
+        con.execute("COPY FROM DATABASE src TO dst (SCHEMA)")
+        tables = [
+            row[0]
+            for row in con.execute(
+                "SELECT table_name FROM duckdb_tables() WHERE database_name = 'src'"
+            ).fetchall()
+        ]
+        rollup_grains = tuple(
+            g for g in ROLLUP_SOURCES if f"{table_name}_{g}" in tables
+        )
+        rollup_tables = [f"{table_name}_{g}" for g in rollup_grains]
+        for table in tables:
+            if table in rollup_tables:
+                continue  # Rebuilt below from the deduplicated rows
+            if table == table_name:
+                select = _dedup_sorted_select(
+                    con, f"src.{table}", latest_first="rowid DESC"
+                )
+            else:
+                select = f"SELECT * FROM src.{table}"
+            con.execute(f"INSERT INTO dst.{table} {select}")
+        con.execute("DETACH src")
+        con.execute("USE dst")
+        if rollup_grains:
+            DuckDBRollups(con, table_name, rollup_grains).rebuild()
+        con.execute(
+            "ANALYZE"
+        )  # Rebuild the statistics (e.g. distinct counts) of the new tables
+        con.execute("CHECKPOINT dst")
+        con.execute("USE memory")
+        con.execute("DETACH dst")
+    finally:
+        con.close()
+
+    # Hold the writer lock from the check through the rename: a writer connecting in between would
+    # write to the old (unlinked) file, and leave its write-ahead log next to the new one
+    try:
+        lock_con = duckdb.connect(path)
+    except duckdb.IOException:
+        os.remove(tmp_path)
+        raise
+    try:
+        current_stat = os.stat(path)
+        if (current_stat.st_mtime_ns, current_stat.st_size) != (
+            source_stat.st_mtime_ns,
+            source_stat.st_size,
+        ):
+            os.remove(tmp_path)
+            raise RuntimeError(
+                f"{path} was modified during the compaction, retry later"
+            )
+        os.replace(tmp_path, path)
+    finally:
+        lock_con.close()
+
+    after = _duckdb_stats(path, table_name)
+    print_report(f"Compaction of {table_name} in {path}", before, after)
+    return {"before": before, "after": after}
+
+
+def compact_parquet(
+    source: str,
+    output: str,
+    row_group_size: int = ROW_GROUP_SIZE,
+    remove_inputs: bool = False,
+) -> dict:
+    """
+    Merge the Parquet files matching source (a path or glob) into output, keeping the latest row per
+    series and hour (last written file, then last row) sorted by period in row groups of
+    row_group_size rows. output is written to a temporary file and renamed into place.
+    The files must share the same schema (e.g. the outputs of one route), so a broad glob does not mix
+    unrelated data.
+    Args:
+        remove_inputs (bool): Delete the merged input files (but output) once output is in place.
+    Returns:
+        dict: {"before": stats, "after": stats} with files, size, rows, row groups and scan timings.
+    Raises:
+        FileNotFoundError: If no file matches source.
+        ValueError: If the files do not share the same schema.
+    """
+    files = sorted(glob.glob(source), key=os.path.getmtime)
+    if not files:
+        raise FileNotFoundError(f"No Parquet file matches {source}")
+
+    con = duckdb.connect()
+    try:
+        schemas = {
+            f: con.execute(
+                f"DESCRIBE SELECT * FROM read_parquet({_sql_string(f)})"
+            ).fetchall()
+            for f in files
+        }
+    finally:
+        con.close()
+    mismatched = [f for f in files if schemas[f] != schemas[files[0]]]
+    if mismatched:
+        raise ValueError(
+            f"{source} matches files with different schemas, e.g. {files[0]} and {mismatched[0]}"
+        )
+
+    before = _parquet_stats(source)
+
+    tmp_output = f"{output}.{os.getpid()}.tmp"
+    con = duckdb.connect()
+    try:
+        con.execute("SET TimeZone = 'UTC'")
+        # The latest row of a key is in the most recently written file, then last in it
+        con.execute(
+            "CREATE TEMP VIEW eia_source AS "
+            + " UNION ALL BY NAME ".join(
+                f"SELECT *, {i} AS _file_index FROM read_parquet({_sql_string(f)}, file_row_number = true)"
+                for i, f in enumerate(files)
+            )
+        )
+        select = _dedup_sorted_select(
+            con,
+            "eia_source",
+            latest_first="_file_index DESC, file_row_number DESC",
+            exclude=("_file_index", "file_row_number"),
+        )
+        con.execute(
+            f"COPY ({select}) TO {_sql_string(tmp_output)} "
+            f"(FORMAT PARQUET, ROW_GROUP_SIZE {int(row_group_size)})"
+        )
+    finally:
+        con.close()
+
+    os.replace(tmp_output, output)
+    if remove_inputs:
+        for f in files:
+            if os.path.abspath(f) != os.path.abspath(output):
+                os.remove(f)
+
+    after = _parquet_stats(output)
+    print_report(f"Compaction of {source} into {output}", before, after)
+    return {"before": before, "after": after}
+
+
+# ================================================
+# Scheduling
+# ================================================
+class BackgroundMaintenance:
+    """
+    Compact the local store every interval_seconds in a daemon thread (or call run_once()).
+    A DuckDB compaction failing because another process has the file open, or wrote to it meanwhile,
+    is skipped and retried at the next run; the skips are recorded in skips, and after
+    max_consecutive_skips of them in a row run_once raises (a connection is kept open, see the module
+    docstring). The Parquet files are merged only when one of them is newer than parquet_output.
+    Use it as a context manager or call start() and stop().
+    Args:
+        duckdb_path (str, optional): DuckDB file to compact, see compact_duckdb.
+        parquet_source (str, optional): Path or glob of Parquet files to merge into parquet_output.
+        remove_inputs (bool): Delete the merged Parquet files, see compact_parquet.
+        max_consecutive_skips (int): Skipped DuckDB compactions in a row before run_once raises.
+    """
+
+    def __init__(
+        self,
+        interval_seconds: float = 3600.0,
+        duckdb_path: Optional[str] = None,
+        table_name: str = "eia_data",
+        parquet_source: Optional[str] = None,
+        parquet_output: Optional[str] = None,
+        remove_inputs: bool = False,
+        max_consecutive_skips: int = 24,
+    ):
+        if duckdb_path is None and parquet_source is None:
+            raise ValueError("Set duckdb_path and/or parquet_source")
+        if parquet_source is not None and parquet_output is None:
+            raise ValueError("parquet_output is required with parquet_source")
+        self.interval_seconds = interval_seconds
+        self.duckdb_path = duckdb_path
+        self.table_name = table_name
+        self.parquet_source = parquet_source
+        self.parquet_output = parquet_output
+        self.remove_inputs = remove_inputs
+        self.max_consecutive_skips = max_consecutive_skips
+        self.reports = []
+        self.skips = []  # (time, error) of the skipped DuckDB compactions
+        self.consecutive_skips = 0
+        self.__stop = threading.Event()
+        self.thread = None
+
+    def __str__(self) -> str:
+        return f"Storage maintenance every {self.interval_seconds:,.0f} s"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def run_once(self) -> list:
+        """
+        Returns:
+            list: The reports of the compactions done (see compact_duckdb and compact_parquet).
+        Raises:
+            RuntimeError: If the DuckDB compaction was skipped max_consecutive_skips times in a row.
+        """
+        reports = []
+        if self.parquet_source is not None and self.__parquet_changed():
+            reports.append(
+                compact_parquet(
+                    self.parquet_source,
+                    self.parquet_output,
+                    remove_inputs=self.remove_inputs,
+                )
+            )
+        if self.duckdb_path is not None:
+            try:
+                reports.append(compact_duckdb(self.duckdb_path, self.table_name))
+                self.consecutive_skips = 0
+            except (FileNotFoundError, duckdb.IOException, RuntimeError) as error:
+                self.skips.append((time.time(), error))
+                self.consecutive_skips += 1
+                print(
+                    f"Compaction of {self.duckdb_path} skipped ({self.consecutive_skips} in a row): {error!r}"
+                )
+        self.reports.extend(reports)
+        if self.consecutive_skips >= self.max_consecutive_skips:
+            raise RuntimeError(
+                f"Compaction of {self.duckdb_path} skipped {self.consecutive_skips} times in a row, "
+                "is a connection to it kept open by another process?"
+            )
+        return reports
+
+    def __parquet_changed(self) -> bool:
+        """Whether an input file (but parquet_output) is newer than parquet_output."""
+        output = os.path.abspath(self.parquet_output)
+        inputs = [
+            f for f in glob.glob(self.parquet_source) if os.path.abspath(f) != output
+        ]
+        if not inputs:
+            return False
+        if not os.path.exists(output):
+            return True
+        return max(os.path.getmtime(f) for f in inputs) > os.path.getmtime(output)
+
+    def start(self) -> None:
+        def loop():
+            while not self.__stop.is_set():
+                try:
+                    self.run_once()
+                except (
+                    Exception
+                ) as error:  # Keep the schedule alive, the next run may succeed
+                    print(f"Storage maintenance run failed: {error!r}")
+                self.__stop.wait(self.interval_seconds)
+
+        self.__stop.clear()
+        self.thread = threading.Thread(target=loop, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.__stop.set()
+        if self.thread is not None:
+            self.thread.join()
@@ -0,0 +1,234 @@
+"""
+This module contains the RequestStats class, which records the latency, size and rows of the API
+responses, and the QueryPlan returned by EIAPolarClient.plan: the chunk plan of a request with its
+estimated rows, response bytes, peak memory and duration, calibrated from the recorded stats.
+"""
+
+import datetime
+import json
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from math import ceil
+from typing import Optional
+
+import polars as pl
+
+# Priors used until some requests have been recorded
+DEFAULT_BYTES_PER_ROW = 250  # JSON row of an hourly route, names included
+DEFAULT_SECONDS_PER_REQUEST = 1.0
+DEFAULT_SECONDS_PER_ROW = 0.0002
+# In-memory footprint per row: parsed JSON (Python dicts and strings) and Polars DataFrame
+PYTHON_BYTES_PER_ROW = 1200
+DATAFRAME_BYTES_PER_ROW = 150
+
+
+class RequestStats:
+    """
+    Thread-safe record of the last requests: (seconds, response bytes, rows).
+    The latency is modelled as seconds = overhead + rows * seconds_per_row (least squares).
+    """
+
+    def __init__(self, maxlen: int = 1000):
+        self.samples = deque(maxlen=maxlen)
+        self.__lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def record(self, seconds: float, n_bytes: int, rows: int) -> None:
+        with self.__lock:
+            self.samples.append((seconds, n_bytes, rows))
+
+    def bytes_per_row(self) -> float:
+        with self.__lock:
+            n_bytes = sum(s[1] for s in self.samples)
+            rows = sum(s[2] for s in self.samples)
+        return n_bytes / rows if rows else DEFAULT_BYTES_PER_ROW
+
+    def latency_model(self) -> tuple:
+        """
+        Returns:
+            tuple: (overhead seconds per request, seconds per row).
+        """
+        with self.__lock:
+            samples = list(self.samples)
+        if not samples:
+            return DEFAULT_SECONDS_PER_REQUEST, DEFAULT_SECONDS_PER_ROW
+
+        n = len(samples)
+        mean_rows = sum(s[2] for s in samples) / n
+        mean_seconds = sum(s[0] for s in samples) / n
+        var_rows = sum((s[2] - mean_rows) ** 2 for s in samples)
+        if n < 3 or var_rows == 0:
+            # Not enough spread to fit a slope: scale the mean latency by the rows
+            return 0.0, (
+                mean_seconds / mean_rows if mean_rows else DEFAULT_SECONDS_PER_ROW
+            )
+        slope = (
+            sum((s[2] - mean_rows) * (s[0] - mean_seconds) for s in samples) / var_rows
+        )
+        slope = max(slope, 0.0)
+        return max(mean_seconds - slope * mean_rows, 0.0), slope
+
+    def save(self, path: str) -> None:
+        """Persist the samples (JSON), e.g. to calibrate the plans of another process."""
+        with self.__lock:
+            samples = list(self.samples)
+        with open(path, "w") as f:
+            json.dump(samples, f)
+
+    def load(self, path: str) -> None:
+        """Append the samples saved by save()."""
+        with open(path) as f:
+            samples = json.load(f)
+        with self.__lock:
+            self.samples.extend(tuple(s) for s in samples)
+
+
+@dataclass
+class ChunkPlan:
+    """One request of the plan."""
+
+    start: datetime.datetime
+    end: datetime.datetime
+    url: str
+    est_rows: int
+    est_bytes: int
+    est_seconds: float
+
+
+@dataclass
+class QueryPlan:
+    """The chunk plan of a get_eia_hourly_data call and its estimated cost."""
+
+    api_path: str
+    facets: Optional[dict]
+    start: datetime.datetime
+    end: datetime.datetime
+    n_timeseries: int
+    max_rows_request: int
+    concurrency: int
+    rate_limit: Optional[float]
+    calibration: str
+    chunks: list = field(default_factory=list)
+
+    @property
+    def n_requests(self) -> int:
+        return len(self.chunks)
+
+    @property
+    def windows(self) -> list:
+        """The (start, end) tuples of the chunks."""
+        return [(chunk.start, chunk.end) for chunk in self.chunks]
+
+    @property
+    def est_rows(self) -> int:
+        return sum(chunk.est_rows for chunk in self.chunks)
+
+    @property
+    def est_response_bytes(self) -> int:
+        return sum(chunk.est_bytes for chunk in self.chunks)
+
+    @property
+    def max_chunk_rows(self) -> int:
+        return max((chunk.est_rows for chunk in self.chunks), default=0)
+
+    @property
+    def est_peak_memory_bytes(self) -> int:
+        """
+        Each chunk is fetched and formatted on a worker thread, so at most concurrency payloads are
+        parsed at once; the formatted chunks are then concatenated (one copy).
+        """
+        n_parsed = min(self.concurrency, self.n_requests)
+        return (
+            n_parsed * self.max_chunk_rows * PYTHON_BYTES_PER_ROW
+            + 2 * self.est_rows * DATAFRAME_BYTES_PER_ROW
+        )
+
+    @property
+    def est_duration_seconds(self) -> float:
+        """Bounded by the concurrency, the slowest chunk and the rate limit."""
+        if not self.chunks:
+            return 0.0
+        latencies = [chunk.est_seconds for chunk in self.chunks]
+        duration = max(sum(latencies) / self.concurrency, max(latencies))
+        if self.rate_limit:
+            duration = max(duration, self.n_requests / self.rate_limit)
+        return duration
+
+    def __str__(self) -> str:
+        return (
+            f"Plan of {self.api_path} from {self.start} to {self.end}\n"
+            f"  time series:      {self.n_timeseries}\n"
+            f"  requests:         {self.n_requests} (max {self.max_rows_request} rows each)\n"
+            f"  rows:             {self.est_rows:,}\n"
+            f"  response size:    {self.est_response_bytes / 1e6:,.1f} MB\n"
+            f"  peak memory:      {self.est_peak_memory_bytes / 1e6:,.1f} MB\n"
+            f"  duration:         {self.est_duration_seconds:,.1f} s "
+            f"(concurrency {self.concurrency}, rate limit {self.rate_limit or '-'} req/s)\n"
+            f"  calibration:      {self.calibration}"
+        )
+
+    def to_polars(self) -> pl.DataFrame:
+        """One row per chunk."""
+        return pl.DataFrame(
+            [vars(chunk) for chunk in self.chunks],
+            schema={
+                "start": pl.Datetime,
+                "end": pl.Datetime,
+                "url": pl.String,
+                "est_rows": pl.Int64,
+                "est_bytes": pl.Int64,
+                "est_seconds": pl.Float64,
+            },
+        )
+
+
+def build_plan(
+    api_path: str,
+    facets: Optional[dict],
+    start: datetime.datetime,
+    end: datetime.datetime,
+    n_timeseries: int,
+    max_rows_request: int,
+    windows: list,
+    urls: list,
+    stats: RequestStats,
+    concurrency: int,
+    rate_limit: Optional[float] = None,
+) -> QueryPlan:
+    """Estimate the cost of each chunk (window) from the request stats."""
+    bytes_per_row = stats.bytes_per_row()
+    overhead, seconds_per_row = stats.latency_model()
+    calibration = (
+        f"{len(stats)} recorded requests"
+        if len(stats)
+        else "defaults (no recorded requests)"
+    )
+
+    plan = QueryPlan(
+        api_path=api_path,
+        facets=facets,
+        start=start,
+        end=end,
+        n_timeseries=n_timeseries,
+        max_rows_request=max_rows_request,
+        concurrency=concurrency,
+        rate_limit=rate_limit,
+        calibration=calibration,
+    )
+    for (dt_start, dt_end), url in zip(windows, urls):
+        n_hours = int((dt_end - dt_start) / datetime.timedelta(hours=1)) + 1
+        rows = n_hours * n_timeseries
+        plan.chunks.append(
+            ChunkPlan(
+                start=dt_start,
+                end=dt_end,
+                url=url,
+                est_rows=rows,
+                est_bytes=ceil(rows * bytes_per_row),
+                est_seconds=overhead + rows * seconds_per_row,
+            )
+        )
+    return plan
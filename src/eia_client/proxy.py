@@ -0,0 +1,316 @@
+"""
+This module contains the EIACachingProxy class, a small local HTTP proxy shared by all the EIA clients
+of a host. Point the clients at it in place of BASE_URL (base_url argument or EIA_BASE_URL environment
+variable), e.g. http://127.0.0.1:8765/v2/. The proxy:
+- deduplicates concurrent identical upstream requests (single flight), sharing only 200 responses,
+- caches the responses on disk, with a least-recently-used eviction bounded in size,
+- serves them to every local process, so popular data is fetched from EIA once per host.
+The cache key ignores the api_key parameter: the requesting client's key is used upstream on a miss.
+Only 200 responses are shared and cached; a request waiting on one that failed (e.g. 403/429 for the
+leader's key) goes upstream with its own key. An upstream request, or a wait on one, longer than timeout
+is answered with a 504, so a hung EIA connection does not block the clients of the host.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+UPSTREAM_URL = "https://api.eia.gov/v2/"
+PROXY_PREFIX = "/v2/"
+
+
+class _Flight:
+    """An upstream request in flight, awaited by the identical requests arriving meanwhile."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.status = 502
+        self.body = b""
+        self.content_type = "application/json"
+
+
+class EIACachingProxy:
+    """
+    Caching, request-coalescing proxy of the EIA API v2. Use it as a context manager (background
+    thread) or call serve_forever().
+    Args:
+        cache_dir (str): Directory of the cached responses.
+        max_cache_bytes (int): Size bound of the cache, least recently used responses are evicted.
+        max_age (float, optional): Seconds a response is served from the cache (None: forever).
+            Recent hours get revised by EIA, so keep it finite for live routes.
+        timeout (float, optional): Seconds to connect and between bytes received upstream, and to
+            wait on an identical request in flight; exceeded, the request gets a 504 (None: no limit).
+        pool_maxsize (int): Upstream connections kept open, match it with the concurrent requests
+            expected from the clients of the host.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = "./data/proxy_cache",
+        max_cache_bytes: int = 1024**3,
+        max_age: Optional[float] = 3600.0,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        upstream_url: str = UPSTREAM_URL,
+        timeout: Optional[float] = 60.0,
+        pool_maxsize: int = 32,
+    ):
+        self.cache_dir = cache_dir
+        self.max_cache_bytes = max_cache_bytes
+        self.max_age = max_age
+        self.upstream_url = upstream_url
+        self.timeout = timeout
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "upstream_errors": 0,
+            "timeouts": 0,
+        }
+        self.__lock = threading.Lock()
+        self.__in_flight = {}  # cache key -> _Flight
+        self.__index = (
+            OrderedDict()
+        )  # cache key -> (size, created), least recently used first
+        self.__cache_bytes = 0
+        self.__session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+        self.__session.mount("http://", adapter)
+        self.__session.mount("https://", adapter)
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self.__load_index()
+        self.httpd = ThreadingHTTPServer((host, port), self.__handler())
+        self.thread = None
+
+    def __str__(self) -> str:
+        return f"EIA caching proxy at {self.base_url}"
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{PROXY_PREFIX}"
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    # ================================================
+    # Private Methods
+    # ================================================
+    def __load_index(self) -> None:
+        """Rebuild the LRU index from the cache directory (older files first)."""
+        entries = []
+        for file_name in os.listdir(self.cache_dir):
+            if file_name.endswith(".json"):
+                stat = os.stat(os.path.join(self.cache_dir, file_name))
+                entries.append(
+                    (stat.st_mtime, file_name[: -len(".json")], stat.st_size)
+                )
+        for mtime, key, size in sorted(entries):
+            self.__index[key] = (size, mtime)
+            self.__cache_bytes += size
+
+    def __cache_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def __cache_key(self, path_tail: str, query: str) -> str:
+        """Route and sorted query parameters, without the api_key."""
+        params = sorted((k, v) for k, v in parse_qsl(query) if k != "api_key")
+        return hashlib.sha256(f"{path_tail}?{urlencode(params)}".encode()).hexdigest()
+
+    def __cache_lookup(self, key: str) -> bool:
+        """True if a fresh response is cached (and mark it as recently used). Holds the lock."""
+        entry = self.__index.get(key)
+        if entry is None:
+            return False
+        if self.max_age is not None and time.time() - entry[1] > self.max_age:
+            self.__evict(key)
+            return False
+        self.__index.move_to_end(key)
+        return True
+
+    def __cache_read(self, key: str) -> Optional[bytes]:
+        """Read a cached body outside the lock, None if it was evicted meanwhile."""
+        try:
+            with open(self.__cache_path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def __cache_put(self, key: str, body: bytes) -> None:
+        """Write a body to the cache and evict the least recently used ones above the size bound."""
+        if len(body) > self.max_cache_bytes:
+            return None
+        path = self.__cache_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+        with self.__lock:
+            if key in self.__index:
+                self.__cache_bytes -= self.__index.pop(key)[0]
+            self.__index[key] = (len(body), time.time())
+            self.__cache_bytes += len(body)
+            while self.__cache_bytes > self.max_cache_bytes:
+                self.__evict(next(iter(self.__index)))
+                self.stats["evictions"] += 1
+
+    def __evict(self, key: str) -> None:
+        """Remove an entry of the cache. Holds the lock."""
+        size, _ = self.__index.pop(key)
+        self.__cache_bytes -= size
+        try:
+            os.remove(self.__cache_path(key))
+        except FileNotFoundError:
+            pass
+
+    def __fetch_upstream(self, path_tail: str, query: str, flight: _Flight) -> None:
+        try:
+            response = self.__session.get(
+                f"{self.upstream_url}{path_tail}?{query}", timeout=self.timeout
+            )
+            flight.status = response.status_code
+            flight.body = response.content
+            flight.content_type = response.headers.get(
+                "Content-Type", "application/json"
+            )
+        except requests.exceptions.Timeout as error:
+            flight.status = 504
+            flight.body = json.dumps({"error": repr(error)}).encode()
+            with self.__lock:
+                self.stats["timeouts"] += 1
+        except requests.exceptions.RequestException as error:
+            flight.status = 502
+            flight.body = json.dumps({"error": repr(error)}).encode()
+            with self.__lock:
+                self.stats["upstream_errors"] += 1
+
+    def get(self, path_tail: str, query: str) -> tuple:
+        """
+        Serve a request from the cache, from an identical request in flight, or from upstream.
+        Args:
+            path_tail (str): The route after /v2/, e.g. electricity/rto/region-sub-ba-data/data/.
+            query (str): The raw query string, api_key included.
+        Returns:
+            tuple: (status, body, content type).
+        """
+        key = self.__cache_key(path_tail, query)
+        with self.__lock:
+            is_cached = self.__cache_lookup(key)
+        body = self.__cache_read(key) if is_cached else None
+        if body is not None:
+            with self.__lock:
+                self.stats["hits"] += 1
+            return 200, body, "application/json"
+
+        with self.__lock:
+            flight = self.__in_flight.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = self.__in_flight[key] = _Flight()
+                self.stats["misses"] += 1
+
+        if is_leader:
+            try:
+                self.__fetch_upstream(path_tail, query, flight)
+                if flight.status == 200:
+                    self.__cache_put(key, flight.body)
+            finally:
+                with self.__lock:
+                    del self.__in_flight[key]
+                flight.done.set()
+            return flight.status, flight.body, flight.content_type
+
+        if not flight.done.wait(self.timeout):
+            with self.__lock:
+                self.stats["timeouts"] += 1
+            body = json.dumps(
+                {
+                    "error": f"Identical upstream request still in flight after {self.timeout} s"
+                }
+            )
+            return 504, body.encode(), "application/json"
+        if flight.status == 200:
+            with self.__lock:
+                self.stats["coalesced"] += 1
+            return flight.status, flight.body, flight.content_type
+
+        # Errors (e.g. 403/429 of the leader's key) are not shared: go upstream with our own key
+        own_flight = _Flight()
+        with self.__lock:
+            self.stats["misses"] += 1
+        self.__fetch_upstream(path_tail, query, own_flight)
+        if own_flight.status == 200:
+            self.__cache_put(key, own_flight.body)
+        return own_flight.status, own_flight.body, own_flight.content_type
+
+    def __handler(self):
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                if parts.path == "/_proxy/stats":
+                    body = json.dumps(proxy.get_stats()).encode()
+                    status, content_type = 200, "application/json"
+                elif parts.path.startswith(PROXY_PREFIX):
+                    status, body, content_type = proxy.get(
+                        parts.path[len(PROXY_PREFIX) :], parts.query
+                    )
+                else:
+                    status, body, content_type = (
+                        404,
+                        b'{"error": "not found"}',
+                        "application/json",
+                    )
+
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    # ================================================
+    # Public Methods
+    # ================================================
+    def get_stats(self) -> dict:
+        """Hits, misses, coalesced requests, evictions, upstream errors, timeouts and cache size (bytes)."""
+        with self.__lock:
+            return {
+                **self.stats,
+                "cache_bytes": self.__cache_bytes,
+                "cache_entries": len(self.__index),
+            }
+
+    def serve_forever(self) -> None:
+        print(
+            f"Serving {self} (cache: {self.cache_dir}, {self.max_cache_bytes / 1e6:,.0f} MB)"
+        )
+        self.httpd.serve_forever()
+
+    def shutdown(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.__session.close()
@@ -0,0 +1,192 @@
+"""
+This module contains the DuckDBRollups class, which maintains materialised aggregates
+(daily, weekly, monthly and yearly SUM(value) per series) alongside the EIA data table in DuckDB.
+"""
+
+import datetime
+from typing import Optional
+
+import duckdb
+import polars as pl
+
+# Each rollup is computed from the cheapest finer source: raw hours -> daily -> weekly/monthly -> yearly
+ROLLUP_SOURCES = {
+    "daily": None,  # i.e. the table with the raw hourly rows
+    "weekly": "daily",
+    "monthly": "daily",
+    "yearly": "monthly",
+}
+
+GRAIN_UNITS = {"daily": "day", "weekly": "week", "monthly": "month", "yearly": "year"}
+
+
+class DuckDBRollups:
+    """
+    Incrementally maintained rollup tables of an EIA data table, named <table_name>_<grain>.
+    Each rollup holds the series columns (all but period and value), a bucket column with the
+    truncated period (UTC), the summed value and the number of hours aggregated.
+    Only the buckets touched by new or revised hours are recomputed on refresh."""
+
+    def __init__(
+        self,
+        con: duckdb.DuckDBPyConnection,
+        table_name: str = "eia_data",
+        grains: tuple = ("daily", "weekly", "monthly", "yearly"),
+    ):
+        for grain in grains:
+            if grain not in ROLLUP_SOURCES:
+                raise ValueError(f"grain must be one of {list(ROLLUP_SOURCES)}")
+        self.con = con
+        self.table_name = table_name
+        # Keep the dependency order, so sources are refreshed before the rollups built on them
+        self.grains = [grain for grain in ROLLUP_SOURCES if grain in grains]
+        # Buckets are truncated in UTC, as the EIA periods
+        self.con.execute("SET TimeZone = 'UTC'")
+
+    # ================================================
+    # Private Methods
+    # ================================================
+    def __rollup_table(self, grain: Optional[str]) -> str:
+        return self.table_name if grain is None else f"{self.table_name}_{grain}"
+
+    def __source_of(self, grain: str) -> Optional[str]:
+        """Return the finest maintained rollup that grain can be computed from (None: raw hours)."""
+        source = ROLLUP_SOURCES[grain]
+        while source is not None and source not in self.grains:
+            source = ROLLUP_SOURCES[source]
+        return source
+
+    def __series_columns(self) -> list:
+        """Series identifier columns of the data table, i.e. all but period and value."""
+        description = self.con.execute(
+            f"SELECT * FROM {self.table_name} LIMIT 0"
+        ).description
+        return [col[0] for col in description if col[0] not in ("period", "value")]
+
+    def __exists(self, table: str) -> bool:
+        return bool(
+            self.con.execute(
+                "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?",
+                [table],
+            ).fetchone()[0]
+        )
+
+    def __select_aggregate(self, grain: str, source: Optional[str], keys: list) -> str:
+        """SELECT statement aggregating source rows into grain buckets."""
+        unit = GRAIN_UNITS[grain]
+        key_cols = ", ".join(f's."{k}"' for k in keys)
+        if source is None:
+            bucket, n_hours = "s.period", "COUNT(s.value)"
+        else:
+            bucket, n_hours = "s.bucket", "SUM(s.n_hours)"
+        return (
+            f"SELECT {key_cols}, date_trunc('{unit}', {bucket}) AS bucket, "
+            f"SUM(s.value) AS value, {n_hours} AS n_hours "
+            f"FROM {self.__rollup_table(source)} s"
+        )
+
+    # ================================================
+    # Public Methods
+    # ================================================
+    def rebuild(self) -> None:
+        """(Re)create every rollup table from scratch."""
+        keys = self.__series_columns()
+        key_cols = ", ".join(f's."{k}"' for k in keys)
+        for grain in self.grains:
+            select = self.__select_aggregate(grain, self.__source_of(grain), keys)
+            self.con.execute(
+                f"CREATE OR REPLACE TABLE {self.__rollup_table(grain)} AS "
+                f"{select} GROUP BY ALL ORDER BY {key_cols}, bucket"
+            )
+
+    def refresh(self, df_new: pl.DataFrame) -> None:
+        """
+        Recompute only the rollup buckets touched by the new or revised hourly rows in df_new.
+        The rows must already be stored in the data table.
+        Args:
+            df_new (pl.DataFrame): The rows just inserted (or upserted) into the data table.
+        """
+        if not all(self.__exists(self.__rollup_table(grain)) for grain in self.grains):
+            self.rebuild()
+            return None
+
+        keys = self.__series_columns()
+        key_cols = ", ".join(f'"{k}"' for k in keys)
+        match_keys = " AND ".join(
+            [f'r."{k}" IS NOT DISTINCT FROM t."{k}"' for k in keys]
+            + ["r.bucket = t.bucket"]
+        )
+        match_source = " AND ".join(
+            [f's."{k}" IS NOT DISTINCT FROM t."{k}"' for k in keys]
+        )
+
+        self.con.register("eia_rollup_new_rows", df_new)
+        try:
+            self.con.execute("BEGIN TRANSACTION")
+            for grain in self.grains:
+                unit = GRAIN_UNITS[grain]
+                source = self.__source_of(grain)
+                rollup_table = self.__rollup_table(grain)
+                self.con.execute(
+                    f"CREATE OR REPLACE TEMP TABLE eia_rollup_touched AS "
+                    f"SELECT DISTINCT {key_cols}, date_trunc('{unit}', period) AS bucket "
+                    f"FROM eia_rollup_new_rows"
+                )
+                self.con.execute(
+                    f"DELETE FROM {rollup_table} r USING eia_rollup_touched t WHERE {match_keys}"
+                )
+                bucket = "s.period" if source is None else "s.bucket"
+                select = self.__select_aggregate(grain, source, keys)
+                self.con.execute(
+                    f"INSERT INTO {rollup_table} BY NAME {select} "
+                    f"SEMI JOIN eia_rollup_touched t ON {match_source} "
+                    f"AND date_trunc('{unit}', {bucket}) = t.bucket GROUP BY ALL"
+                )
+            self.con.execute("DROP TABLE eia_rollup_touched")
+            self.con.execute("COMMIT")
+        except Exception:
+            self.con.execute("ROLLBACK")
+            raise
+        finally:
+            self.con.unregister("eia_rollup_new_rows")
+
+        return None
+
+    def query(
+        self,
+        grain: str,
+        start: Optional[datetime.datetime] = None,
+        end: Optional[datetime.datetime] = None,
+    ) -> pl.DataFrame:
+        """
+        Serve SUM(value) per series and grain bucket from the cheapest rollup available.
+        Args:
+            grain (str): "daily", "weekly", "monthly" or "yearly".
+            start (datetime, optional): First bucket to return (naive, UTC).
+            end (datetime, optional): Last bucket to return (naive, UTC).
+        Returns:
+            pl.DataFrame: The series columns, bucket, value and n_hours, sorted by series and bucket.
+        """
+        if grain not in GRAIN_UNITS:
+            raise ValueError(f"grain must be one of {list(GRAIN_UNITS)}")
+
+        keys = self.__series_columns()
+        key_cols = ", ".join(f'"{k}"' for k in keys)
+        # The grain itself if maintained, otherwise the coarsest rollup nested in it
+        source = grain if grain in self.grains else self.__source_of(grain)
+        if source == grain:
+            query = f"SELECT * FROM {self.__rollup_table(grain)} s"
+        else:
+            query = f"SELECT * FROM ({self.__select_aggregate(grain, source, keys)} GROUP BY ALL) s"
+
+        filters, params = [], []
+        if start is not None:
+            filters.append("s.bucket >= CAST(? AS TIMESTAMPTZ)")
+            params.append(start.strftime("%Y-%m-%d %H:%M:%S+00"))
+        if end is not None:
+            filters.append("s.bucket <= CAST(? AS TIMESTAMPTZ)")
+            params.append(end.strftime("%Y-%m-%d %H:%M:%S+00"))
+        if filters:
+            query += " WHERE " + " AND ".join(filters)
+
+        return self.con.execute(f"{query} ORDER BY {key_cols}, bucket", params).pl()
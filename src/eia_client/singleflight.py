@@ -0,0 +1,139 @@
+"""
+This module contains the in-process request coalescing of the EIAPolarClient:
+- SingleFlight: concurrent calls with the same key (e.g. the same url) share one execution and result.
+- ChunkCoalescer: concurrent chunk requests of the same series with overlapping time windows are split,
+  so the hours already in flight are awaited instead of fetched again, and only the gaps are requested.
+"""
+
+import datetime
+import threading
+from concurrent.futures import Future
+from typing import Callable
+
+import polars as pl
+
+ONE_HOUR = datetime.timedelta(hours=1)
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls by key: the first caller executes, the others wait for its result."""
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__in_flight = {}  # key -> Future
+        self.n_coalesced = 0
+
+    def do(self, key, fn: Callable):
+        with self.__lock:
+            future = self.__in_flight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = self.__in_flight[key] = Future()
+            else:
+                self.n_coalesced += 1
+
+        if not is_leader:
+            return future.result()
+
+        try:
+            future.set_result(fn())
+        except BaseException as error:
+            future.set_exception(error)
+        finally:
+            with self.__lock:
+                del self.__in_flight[key]
+        return future.result()
+
+
+class _WindowFlight:
+    """A chunk request in flight: the hours start..end (inclusive) of a series."""
+
+    def __init__(self, start: datetime.datetime, end: datetime.datetime):
+        self.start = start
+        self.end = end
+        self.future = Future()
+
+
+class ChunkCoalescer:
+    """
+    Registry of the chunk windows in flight per series key. A request for start..end is planned as
+    pieces: sub-ranges of windows already in flight (awaited and sliced) and the gaps between them
+    (fetched by the caller). The caller fetches its own gaps before awaiting others, so no deadlock.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__flights = {}  # series key -> list of _WindowFlight
+        self.hours_coalesced = 0
+
+    def __plan(
+        self, series_key: str, start: datetime.datetime, end: datetime.datetime
+    ) -> tuple:
+        """Split start..end into pieces (flight, start, end), registering the gaps as new flights."""
+        flights = self.__flights.setdefault(series_key, [])
+        pieces, own_flights = [], []
+        cursor = start
+        while cursor <= end:
+            covering = [f for f in flights if f.start <= cursor <= f.end]
+            if covering:
+                flight = max(covering, key=lambda f: f.end)
+                piece_end = min(flight.end, end)
+                self.hours_coalesced += int((piece_end - cursor) / ONE_HOUR) + 1
+            else:
+                later = [f.start for f in flights if cursor < f.start <= end]
+                piece_end = min(later) - ONE_HOUR if later else end
+                flight = _WindowFlight(cursor, piece_end)
+                own_flights.append(flight)
+            pieces.append((flight, cursor, piece_end))
+            cursor = piece_end + ONE_HOUR
+        flights.extend(own_flights)
+        return pieces, own_flights
+
+    def fetch(
+        self,
+        series_key: str,
+        start: datetime.datetime,
+        end: datetime.datetime,
+        fetch_window: Callable,
+    ) -> pl.DataFrame:
+        """
+        Fetch the hours start..end of a series, sharing the overlapping windows in flight.
+        Args:
+            series_key (str): Identifies the series, i.e. api_path and facets.
+            fetch_window (Callable): Function (start, end) -> formatted pl.DataFrame sorted by period.
+        Returns:
+            pl.DataFrame: The hours start..end sorted by period.
+        """
+        with self.__lock:
+            pieces, own_flights = self.__plan(series_key, start, end)
+
+        for flight in own_flights:
+            try:
+                flight.future.set_result(fetch_window(flight.start, flight.end))
+            except BaseException as error:
+                flight.future.set_exception(error)
+            finally:
+                with self.__lock:
+                    self.__flights[series_key].remove(flight)
+                    if not self.__flights[series_key]:
+                        del self.__flights[series_key]
+
+        if len(pieces) == 1 and pieces[0][0] in own_flights:
+            return pieces[0][0].future.result()  # Nothing shared: no slicing
+
+        list_with_dfs = []
+        for flight, piece_start, piece_end in pieces:
+            df = flight.future.result()
+            if df.is_empty():
+                continue
+            lo = df["period"].search_sorted(
+                piece_start.replace(tzinfo=datetime.timezone.utc), side="left"
+            )
+            hi = df["period"].search_sorted(
+                piece_end.replace(tzinfo=datetime.timezone.utc), side="right"
+            )
+            list_with_dfs.append(df.slice(lo, hi - lo))
+
+        if not list_with_dfs:
+            return pl.DataFrame()
+        return pl.concat(list_with_dfs)
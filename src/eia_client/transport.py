@@ -0,0 +1,169 @@
+"""
+This module contains the HTTP transports of the EIA clients:
+- RequestsTransport: HTTP/1.1 over a pooled requests.Session, one connection per concurrent request.
+- HTTP2Transport: HTTP/2 over httpx (optional dependency: pip install "httpx[http2]"), multiplexing
+  the concurrent chunk requests over a few connections. Servers without HTTP/2 are spoken to in HTTP/1.1.
+A transport is called as send(url, params) -> response, hence it plugs into APIKeyPool.request.
+Responses and errors follow the requests interface (ok, status_code, content, json(), raise_for_status()
+and requests.exceptions), whatever the transport.
+"""
+
+from abc import ABC, abstractmethod
+from typing import Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class Transport(ABC):
+    """Base class: send a GET request and return a requests-like response."""
+
+    http_version = None
+
+    def __call__(self, url: str, params: dict):
+        return self.get(url, params)
+
+    def __str__(self) -> str:
+        return f"{type(self).__name__} ({self.http_version})"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @abstractmethod
+    def get(self, url: str, params: dict):
+        """Send a GET request of url with the query params merged in."""
+
+    def close(self) -> None:
+        pass
+
+
+class RequestsTransport(Transport):
+    """
+    HTTP/1.1 with keep-alive connections, up to pool_maxsize per host (one per concurrent request).
+    Args:
+        pool_maxsize (int): Connections kept per host, match it with the concurrency.
+        timeout (float, optional): Seconds to connect and between bytes received.
+    """
+
+    http_version = "HTTP/1.1"
+
+    def __init__(self, pool_maxsize: int = 32, timeout: Optional[float] = None):
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, url: str, params: dict) -> requests.Response:
+        return self.session.get(url=url, params=params, timeout=self.timeout)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class _HTTPXResponse:
+    """Wrap an httpx.Response in the requests.Response interface used by the clients."""
+
+    def __init__(self, response):
+        self.__response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.content = response.content
+        self.url = str(response.url)
+        self.http_version = response.http_version
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    def json(self):
+        return self.__response.json()
+
+    def raise_for_status(self) -> None:
+        if not self.ok:
+            raise requests.exceptions.HTTPError(
+                f"{self.status_code} Error for url: {self.url}", response=self
+            )
+
+
+class HTTP2Transport(Transport):
+    """
+    HTTP/2 over httpx: the concurrent requests to a host share max_connections connections
+    (multiplexed streams), saving the TCP/TLS set-up of a connection per request.
+    The protocol is negotiated with TLS (ALPN), so HTTPS servers without HTTP/2 get HTTP/1.1.
+    Args:
+        max_connections (int): Bound of the connections. An HTTP/2 server gets the concurrent requests
+            multiplexed over one connection, the HTTP/1.1 fallback needs one per concurrent request,
+            hence keep it above the concurrency (as pool_maxsize of RequestsTransport).
+        timeout (float, optional): Seconds to connect, read and write, None to wait forever.
+        prior_knowledge (bool): Speak HTTP/2 right away on plain http:// urls (h2c), e.g. to a
+            local HTTP/2 server; otherwise plain http:// urls use HTTP/1.1.
+    Raises:
+        ImportError: If httpx (with its http2 extra) is not installed, see make_transport.
+    """
+
+    http_version = "HTTP/2"
+
+    def __init__(
+        self,
+        max_connections: int = 32,
+        timeout: Optional[float] = None,
+        prior_knowledge: bool = False,
+    ):
+        import httpx  # Optional dependency
+        import h2  # noqa: F401  Required by httpx for HTTP/2
+
+        self.__httpx = httpx
+        self.client = httpx.Client(
+            http1=not prior_knowledge,
+            http2=True,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        )
+
+    def get(self, url: str, params: dict) -> _HTTPXResponse:
+        httpx = self.__httpx
+        try:
+            # Merge into the query string of the url (httpx would replace it by params)
+            url = httpx.URL(url).copy_merge_params(params)
+            return _HTTPXResponse(self.client.get(url))
+        except httpx.TimeoutException as error:
+            raise requests.exceptions.Timeout(repr(error)) from error
+        except httpx.TransportError as error:
+            raise requests.exceptions.ConnectionError(repr(error)) from error
+        except httpx.HTTPError as error:
+            raise requests.exceptions.RequestException(repr(error)) from error
+
+    def close(self) -> None:
+        self.client.close()
+
+
+def make_transport(transport: Union[str, Transport, None] = "auto") -> Transport:
+    """
+    Args:
+        transport: "auto" (HTTP/2 if httpx[http2] is installed, HTTP/1.1 otherwise), "http2",
+            "http1", or a Transport instance (returned as is).
+    Returns:
+        Transport: The transport of a client.
+    Raises:
+        ImportError: If "http2" is requested and httpx[http2] is not installed.
+        ValueError: If the transport name is unknown.
+    """
+    if isinstance(transport, Transport):
+        return transport
+    if transport in (None, "auto"):
+        try:
+            return HTTP2Transport()
+        except ImportError:
+            return RequestsTransport()
+    if transport == "http2":
+        return HTTP2Transport()
+    if transport == "http1":
+        return RequestsTransport()
+    raise ValueError('transport must be "auto", "http2", "http1" or a Transport')
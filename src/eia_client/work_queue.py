@@ -0,0 +1,286 @@
+"""
+This module contains the SQLiteWorkQueue class and the coordinator/worker functions of a distributed
+backfill: the coordinator enqueues the planned chunks in a shared SQLite file, and any number of worker
+processes on the same host claim the chunks with a lease, fetch them, write them to a shared
+ArrowChunkStore and mark them done. Chunks leased by a crashed worker are claimed again once their lease
+expires.
+SQLite is used (instead of DuckDB) because it supports concurrent writers from several processes.
+The queue file must be on a local filesystem: its WAL journal relies on shared memory between the
+processes, which network filesystems (NFS, SMB) do not provide, so workers on other nodes are not supported.
+"""
+
+import contextlib
+import datetime
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from .chunk_store import ArrowChunkStore
+
+WINDOW_FORMAT = "%Y-%m-%dT%H"
+
+
+class SQLiteWorkQueue:
+    """
+    A durable queue of chunks (api_path, facets, start, end) in a SQLite file.
+    Each chunk goes through: pending -> leased -> done, or back to pending when the worker fails
+    or its lease expires, until max_attempts is reached (failed)."""
+
+    def __init__(
+        self,
+        path: str = "./data/queue/eia_queue.sqlite",
+        lease_seconds: float = 300.0,
+        max_attempts: int = 5,
+    ):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self.__connect() as con:
+            con.execute(
+                "PRAGMA journal_mode=WAL"
+            )  # Local filesystem only, see the module docstring
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS chunks (
+                    id INTEGER PRIMARY KEY,
+                    api_path TEXT NOT NULL,
+                    facets TEXT NOT NULL,
+                    start TEXT NOT NULL,
+                    end TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    worker TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    rows INTEGER,
+                    error TEXT,
+                    UNIQUE (api_path, facets, start, end)
+                )
+                """)
+
+    def __str__(self) -> str:
+        return f"SQLite work queue at {self.path}"
+
+    # ================================================
+    # Private Methods
+    # ================================================
+    @contextlib.contextmanager
+    def __connect(self):
+        # isolation_level=None: autocommit, transactions are explicit (BEGIN IMMEDIATE when claiming)
+        con = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        try:
+            yield con
+        finally:
+            con.close()
+
+    # ================================================
+    # Public Methods
+    # ================================================
+    def enqueue(self, api_path: str, facets: Optional[dict], windows: list) -> int:
+        """
+        Add the chunks (start, end) of a series to the queue, skipping those already queued.
+        Returns:
+            int: The number of chunks added.
+        """
+        facets_json = json.dumps(facets or {}, sort_keys=True)
+        rows = [
+            (
+                api_path,
+                facets_json,
+                start.strftime(WINDOW_FORMAT),
+                end.strftime(WINDOW_FORMAT),
+            )
+            for start, end in windows
+        ]
+        with self.__connect() as con:
+            before = con.total_changes
+            con.executemany(
+                "INSERT OR IGNORE INTO chunks (api_path, facets, start, end) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            return con.total_changes - before
+
+    def claim(self, worker: str) -> Optional[dict]:
+        """
+        Lease the next pending (or expired) chunk to a worker.
+        Returns:
+            dict: The chunk (id, api_path, facets, start, end, attempts), or None if nothing is claimable.
+        """
+        now = time.time()
+        with self.__connect() as con:
+            con.execute(
+                "BEGIN IMMEDIATE"
+            )  # Take the write lock, so two workers can't claim the same chunk
+            try:
+                # Expired leases of chunks out of attempts will never be claimed again
+                con.execute(
+                    """
+                    UPDATE chunks SET status = 'failed', error = 'lease expired'
+                    WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?
+                    """,
+                    (now, self.max_attempts),
+                )
+                row = con.execute(
+                    """
+                    SELECT id, api_path, facets, start, end, attempts FROM chunks
+                    WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?)
+                    ORDER BY id LIMIT 1
+                    """,
+                    (now,),
+                ).fetchone()
+                if row is not None:
+                    con.execute(
+                        """
+                        UPDATE chunks
+                        SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1
+                        WHERE id = ?
+                        """,
+                        (worker, now + self.lease_seconds, row[0]),
+                    )
+                con.execute("COMMIT")
+            except Exception:
+                con.execute("ROLLBACK")
+                raise
+
+        if row is None:
+            return None
+
+        return {
+            "id": row[0],
+            "api_path": row[1],
+            "facets": json.loads(row[2]) or None,
+            "start": datetime.datetime.strptime(row[3], WINDOW_FORMAT),
+            "end": datetime.datetime.strptime(row[4], WINDOW_FORMAT),
+            "attempts": row[5] + 1,
+        }
+
+    def renew(self, chunk_id: int, worker: str) -> bool:
+        """Extend the lease of a chunk still owned by the worker. Returns False if it was lost."""
+        with self.__connect() as con:
+            cursor = con.execute(
+                "UPDATE chunks SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                (time.time() + self.lease_seconds, chunk_id, worker),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, chunk_id: int, rows: int) -> None:
+        """Mark a chunk as done. Idempotent: a chunk fetched twice is written twice to the same file."""
+        with self.__connect() as con:
+            con.execute(
+                "UPDATE chunks SET status = 'done', rows = ?, error = NULL WHERE id = ?",
+                (rows, chunk_id),
+            )
+
+    def fail(self, chunk_id: int, worker: str, error: str) -> None:
+        """Release a chunk after an error: back to pending, or failed after max_attempts."""
+        with self.__connect() as con:
+            con.execute(
+                """
+                UPDATE chunks
+                SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                    error = ?, lease_expires = NULL
+                WHERE id = ? AND worker = ? AND status = 'leased'
+                """,
+                (self.max_attempts, error, chunk_id, worker),
+            )
+
+    def progress(self) -> dict:
+        """Number of chunks per status, e.g. {"pending": 3, "leased": 2, "done": 10}."""
+        with self.__connect() as con:
+            return dict(
+                con.execute(
+                    "SELECT status, COUNT(*) FROM chunks GROUP BY status"
+                ).fetchall()
+            )
+
+    def is_finished(self) -> bool:
+        """True when no chunk is pending nor leased (failed chunks are not retried anymore)."""
+        progress = self.progress()
+        return not progress.get("pending") and not progress.get("leased")
+
+
+def enqueue_backfill(
+    client,
+    queue: SQLiteWorkQueue,
+    api_path: str,
+    facets: Optional[dict],
+    start: datetime.datetime,
+    end: datetime.datetime,
+    max_rows_request: int = 4000,
+) -> int:
+    """
+    Coordinator: probe the series, plan the chunks and enqueue them.
+    Args:
+        client (EIAPolarClient): The client used to probe the API.
+    Returns:
+        int: The number of chunks added to the queue.
+    """
+    windows = client.get_chunk_windows(api_path, facets, start, end, max_rows_request)
+    n_added = queue.enqueue(api_path, facets, windows)
+    print(f"\n{n_added} chunks added to the {queue}")
+    return n_added
+
+
+def run_worker(
+    client,
+    queue: SQLiteWorkQueue,
+    chunk_store: ArrowChunkStore,
+    worker: Optional[str] = None,
+    poll_interval: float = 1.0,
+    exit_when_finished: bool = True,
+) -> int:
+    """
+    Worker: claim, fetch and store chunks until the queue is finished.
+    The lease is renewed in the background while a chunk is being fetched.
+    Args:
+        client (EIAPolarClient): The client used to fetch the chunks.
+        queue (SQLiteWorkQueue): The shared queue.
+        chunk_store (ArrowChunkStore): The shared sink of the fetched chunks.
+        worker (str, optional): Worker identifier, defaults to <host>:<pid>.
+        poll_interval (float): Seconds to wait when no chunk is claimable yet (e.g. leased by others).
+        exit_when_finished (bool): Return when no chunk is pending nor leased, otherwise keep polling.
+    Returns:
+        int: The number of chunks fetched by this worker.
+    """
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    n_fetched = 0
+
+    while True:
+        chunk = queue.claim(worker)
+        if chunk is None:
+            if exit_when_finished and queue.is_finished():
+                return n_fetched
+            time.sleep(poll_interval)
+            continue
+
+        # Heartbeat: keep the lease alive while fetching
+        stop = threading.Event()
+
+        def heartbeat():
+            while not stop.wait(queue.lease_seconds / 3):
+                queue.renew(chunk["id"], worker)
+
+        heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+        heartbeat_thread.start()
+        try:
+            df = client.fetch_chunk(
+                chunk["api_path"], chunk["facets"], chunk["start"], chunk["end"]
+            )
+            if not df.is_empty():
+                chunk_store.put(
+                    df, chunk["api_path"], chunk["facets"], chunk["start"], chunk["end"]
+                )
+        except Exception as error:
+            queue.fail(chunk["id"], worker, repr(error))
+            print(f"{worker} failed chunk {chunk['id']}: {error!r}")
+            continue
+        finally:
+            stop.set()
+            heartbeat_thread.join()
+
+        queue.complete(chunk["id"], df.height)
+        n_fetched += 1
@@ -76,3 +76,16 @@ if __name__ == "__main__":
 
     print(df_pq_yearly)                       
                              
+
+
+    # ------------ e.g. 5 Aggregates from the rollup tables ------------
+    # save_df_as_duckdb maintains daily/weekly/monthly/yearly rollups next to eia_data.
+    # Aggregates are served from the cheapest rollup available (raw hours if none exists).
+    import os
+    import sys
+    sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "src"))
+    from eia_client import EIAPolarClient
+
+    client = EIAPolarClient(api_key=os.getenv("EIA_API_KEY"))
+    df_rollup_monthly = client.query_duckdb_rollup("monthly", path="./data/demo/eia_sdge_2024_demo.duckdb")
+    print(df_rollup_monthly)
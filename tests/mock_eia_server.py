@@ -0,0 +1,142 @@
+"""
+Local stand-in for the EIA API v2, used by the tests that must run without an API key.
+It serves hourly rows for a handful of sub-balancing-authority series, honouring the
+facets, start and end query parameters the clients build into their endpoint urls.
+"""
+
+import datetime
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+SERIES = [
+    {
+        "subba": "SDGE",
+        "subba-name": "San Diego Gas and Electric",
+        "parent": "CISO",
+        "parent-name": "California Independent System Operator",
+    },
+    {
+        "subba": "PGAE",
+        "subba-name": "Pacific Gas and Electric",
+        "parent": "CISO",
+        "parent-name": "California Independent System Operator",
+    },
+    {
+        "subba": "SCE",
+        "subba-name": "Southern California Edison",
+        "parent": "CISO",
+        "parent-name": "California Independent System Operator",
+    },
+    {
+        "subba": "ZONA",
+        "subba-name": "Zone A",
+        "parent": "NYIS",
+        "parent-name": "New York Independent System Operator",
+    },
+]
+
+
+def mock_value(subba: str, period: datetime.datetime, revision: int = 0) -> float:
+    """Deterministic hourly value of a series, shifted by the server revision."""
+    return float(sum(map(ord, subba)) + period.hour * 10 + period.day + revision)
+
+
+class MockEIAServer:
+    """Threaded HTTP server mimicking the EIA API. Use it as a context manager."""
+
+    def __init__(
+        self, latency: float = 0.0, max_rows: int = 5000, latency_fn=None, error_fn=None
+    ):
+        self.latency = latency
+        self.max_rows = max_rows
+        # Hooks called with the request number (from 1) and query: extra seconds / HTTP error status
+        self.latency_fn = latency_fn
+        self.error_fn = error_fn
+        self.revision = 0
+        self.revised_from = (
+            None  # Only the hours from this datetime get the revision, if set
+        )
+        self.requests = []
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self.__handler())
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/v2/"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def rows(self, query: list) -> list:
+        """Build the data rows for a parsed query string."""
+        params = dict(query)
+        facets = {}
+        for key, value in query:
+            if key.startswith("facets["):
+                facets.setdefault(key[len("facets[") : key.index("]")], []).append(
+                    value
+                )
+        start = datetime.datetime.strptime(params["start"], "%Y-%m-%dT%H")
+        end = datetime.datetime.strptime(params["end"], "%Y-%m-%dT%H")
+        series = [s for s in SERIES if all(s.get(k) in v for k, v in facets.items())]
+        rows = []
+        period = start
+        while period <= end:
+            revision = (
+                self.revision
+                if self.revised_from is None or period >= self.revised_from
+                else 0
+            )
+            for s in series:
+                rows.append(
+                    {
+                        "period": period.strftime("%Y-%m-%dT%H"),
+                        **s,
+                        "value": str(mock_value(s["subba"], period, revision)),
+                        "value-units": "megawatthours",
+                    }
+                )
+            period += datetime.timedelta(hours=1)
+        return rows[: self.max_rows]
+
+    def __handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                query = parse_qsl(parts.query)
+                with server.lock:
+                    server.requests.append(self.path)
+                    n_request = len(server.requests)
+                latency = server.latency
+                if server.latency_fn:
+                    latency += server.latency_fn(n_request, query)
+                if latency:
+                    time.sleep(latency)
+                status = server.error_fn(n_request, query) if server.error_fn else None
+                if status:
+                    self.send_error(status)
+                    return
+                body = json.dumps({"response": {"data": server.rows(query)}}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,84 @@
+import datetime
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.append(os.path.dirname(__file__))
+from eia_client import EIAPolarClient
+from eia_client.adaptive import AdaptiveController
+from mock_eia_server import MockEIAServer
+
+API_PATH = "electricity/rto/region-sub-ba-data/data/"
+FACETS = {"parent": "CISO"}
+DT_START = datetime.datetime(2024, 1, 1, 0)
+DT_END = datetime.datetime(2024, 3, 31, 23)
+
+
+def test_adaptive_fetch_hedges_slow_chunks():
+    # Every 7th request hangs for 3 seconds (not the retries); its hedged duplicate should win
+    seen_windows = set()
+
+    def latency_fn(n_request, query):
+        window = dict(query)["start"]
+        is_first_try = window not in seen_windows
+        seen_windows.add(window)
+        return 3.0 if n_request > 2 and n_request % 7 == 0 and is_first_try else 0.0
+
+    with MockEIAServer(latency_fn=latency_fn) as server:
+        client = EIAPolarClient("mock-key")
+        client.BASE_URL = server.base_url
+        controller = AdaptiveController(rows_per_request=300, hedge_min_samples=3)
+
+        start_time = time.time()
+        df = client.get_eia_hourly_data(
+            api_path=API_PATH,
+            facets=FACETS,
+            start=DT_START,
+            end=DT_END,
+            adaptive=controller,
+        )
+        elapsed = time.time() - start_time
+
+    assert df.height == 91 * 24 * 3
+    assert df["period"].is_sorted()
+    assert df.select("period", "subba").is_duplicated().sum() == 0
+    assert controller.n_hedged >= 1
+    assert controller.rows_per_request > 300
+    assert elapsed < 3.0
+
+    return print(controller)
+
+
+def test_adaptive_fetch_backs_off_on_rate_limit():
+    # Some requests are rate limited (429): the chunks are retried in halves
+    def error_fn(n_request, query):
+        return 429 if n_request in (3, 4, 6) else None
+
+    with MockEIAServer(error_fn=error_fn) as server:
+        client = EIAPolarClient("mock-key")
+        client.BASE_URL = server.base_url
+        controller = AdaptiveController(rows_per_request=1000, concurrency=8)
+
+        df = client.get_eia_hourly_data(
+            api_path=API_PATH,
+            facets=FACETS,
+            start=DT_START,
+            end=DT_END,
+            adaptive=controller,
+        )
+
+    assert df.height == 91 * 24 * 3
+    assert df.select("period", "subba").is_duplicated().sum() == 0
+    assert controller.n_errors == 3
+
+    return print(controller)
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+    test_adaptive_fetch_hedges_slow_chunks()
+    test_adaptive_fetch_backs_off_on_rate_limit()
+    end_time = time.time()
+
+    print(f"\nElapsed time: {end_time - start_time} seconds")
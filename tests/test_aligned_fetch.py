@@ -0,0 +1,104 @@
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+import duckdb
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.append(os.path.dirname(__file__))
+from eia_client import EIAPolarClient
+from mock_eia_server import MockEIAServer, mock_value
+
+
+def test_multi_route_aligned_fetch():
+    api_path = "electricity/rto/region-sub-ba-data/data/"
+    specs = {
+        "ciso": {"api_path": api_path, "facets": {"parent": "CISO"}},  # 3 series
+        "nyis": {"api_path": api_path, "facets": {"subba": "ZONA"}},  # 1 series
+    }
+    dt_start = datetime.datetime(2024, 5, 1, 0)
+    dt_end = datetime.datetime(2024, 5, 7, 23)
+
+    with MockEIAServer() as server, tempfile.TemporaryDirectory() as tmp_dir:
+        client = EIAPolarClient("mock-key", base_url=server.base_url)
+        path = os.path.join(tmp_dir, "eia.duckdb")
+        df = client.get_eia_hourly_aligned(
+            specs, start=dt_start, end=dt_end, max_rows_request=100, path=path
+        )
+
+        with duckdb.connect(path, read_only=True) as con:
+            assert (
+                con.execute("SELECT COUNT(*) FROM eia_aligned").fetchone()[0]
+                == df.height
+            )
+
+    # Named after the facets: subba is left open for ciso, parent for nyis
+    assert df.columns == ["period", "ciso.SDGE", "ciso.PGAE", "ciso.SCE", "nyis.NYIS"]
+    assert df.height == 7 * 24
+    assert df["period"].is_sorted()
+    assert df.null_count().sum_horizontal()[0] == 0
+    row = df.row(30, named=True)
+    period = dt_start + datetime.timedelta(hours=30)
+    assert row["period"] == period.replace(tzinfo=datetime.timezone.utc)
+    assert row["ciso.PGAE"] == mock_value("PGAE", period)
+    assert row["nyis.NYIS"] == mock_value("ZONA", period)
+
+    return print("\nMulti-route aligned fetch test passed!")
+
+
+def test_aligned_column_names_are_stable():
+    api_path = "electricity/rto/region-sub-ba-data/data/"
+    dt_start = datetime.datetime(2024, 5, 1, 0)
+    dt_end = datetime.datetime(2024, 5, 1, 23)
+
+    with MockEIAServer() as server:
+        client = EIAPolarClient("mock-key", base_url=server.base_url)
+        # A single series returned: still named by the subba left open by the facets
+        df = client.get_eia_hourly_aligned(
+            {
+                "ciso": {
+                    "api_path": api_path,
+                    "facets": {"parent": "CISO", "subba": ["SDGE"]},
+                }
+            },
+            start=dt_start,
+            end=dt_end,
+        )
+        assert df.columns == ["period", "ciso"]
+        df = client.get_eia_hourly_aligned(
+            {
+                "ciso": {
+                    "api_path": api_path,
+                    "facets": {"parent": "CISO", "subba": ["SDGE", "XXXX"]},
+                }
+            },
+            start=dt_start,
+            end=dt_end,
+        )
+        assert df.columns == ["period", "ciso.SDGE"]
+
+        with pytest.raises(ValueError):
+            client.get_eia_hourly_aligned(
+                {
+                    "ciso.SDGE": {
+                        "api_path": api_path,
+                        "facets": {"parent": "CISO", "subba": "SDGE"},
+                    },
+                    "ciso": {"api_path": api_path, "facets": {"parent": "CISO"}},
+                },
+                start=dt_start,
+                end=dt_end,
+            )
+
+    return print("\nAligned column names test passed!")
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+    test_multi_route_aligned_fetch()
+    test_aligned_column_names_are_stable()
+    end_time = time.time()
+    print(f"\nExecution time: {end_time - start_time:.2f} seconds")
@@ -0,0 +1,147 @@
+import datetime
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.append(os.path.dirname(__file__))
+from eia_client import EIACachingProxy, EIAPolarClient
+from mock_eia_server import MockEIAServer
+
+API_PATH = "electricity/rto/region-sub-ba-data/data/"
+FACETS = {"parent": "CISO"}
+
+
+def fetch_through(base_url: str, api_key: str):
+    client = EIAPolarClient(api_key, base_url=base_url)
+    return client.get_eia_hourly_data(
+        api_path=API_PATH,
+        facets=FACETS,
+        start=datetime.datetime(2024, 1, 1, 0),
+        end=datetime.datetime(2024, 2, 29, 23),
+        max_rows_request=600,
+    )
+
+
+def test_caching_proxy_fetches_once_per_host():
+    with MockEIAServer(latency=0.2) as server, tempfile.TemporaryDirectory() as tmp_dir:
+        with EIACachingProxy(
+            cache_dir=tmp_dir, port=0, upstream_url=server.base_url
+        ) as proxy:
+            # Concurrent identical requests from several clients (and keys) share the upstream requests
+            with ThreadPoolExecutor() as executor:
+                dfs = list(
+                    executor.map(
+                        fetch_through, [proxy.base_url] * 4, ["a", "b", "c", "d"]
+                    )
+                )
+            n_upstream = len(server.requests)
+            assert all(df.equals(dfs[0]) for df in dfs)
+            stats = json.loads(
+                requests.get(proxy.base_url.replace("/v2/", "/_proxy/stats")).text
+            )
+            assert stats["misses"] == n_upstream
+            assert (
+                stats["misses"] + stats["coalesced"] + stats["hits"] == 4 * n_upstream
+            )
+            # A fifth call is served from the disk cache only
+            fetch_through(proxy.base_url, "e")
+            assert len(server.requests) == n_upstream
+
+        # The cache survives a restart of the proxy
+        with EIACachingProxy(
+            cache_dir=tmp_dir, port=0, upstream_url=server.base_url
+        ) as proxy:
+            assert fetch_through(proxy.base_url, "f").equals(dfs[0])
+            assert len(server.requests) == n_upstream
+
+    return print(stats)
+
+
+def test_caching_proxy_does_not_share_errors():
+    # The key "bad" is forbidden upstream, the slow response keeps the request in flight
+    def error_fn(n_request, query):
+        return 403 if ("api_key", "bad") in query else None
+
+    url_tail = f"{API_PATH}?data[]=value&facets[parent][]=CISO&start=2024-01-01T00&end=2024-01-01T23"
+    with MockEIAServer(
+        latency=0.5, error_fn=error_fn
+    ) as server, tempfile.TemporaryDirectory() as tmp_dir:
+        with EIACachingProxy(
+            cache_dir=tmp_dir, port=0, upstream_url=server.base_url
+        ) as proxy:
+
+            def get(api_key):
+                return requests.get(f"{proxy.base_url}{url_tail}&api_key={api_key}")
+
+            with ThreadPoolExecutor() as executor:
+                bad = executor.submit(get, "bad")
+                time.sleep(0.1)  # "good" arrives while "bad" is in flight
+                good = executor.submit(get, "good")
+                assert bad.result().status_code == 403
+                assert good.result().status_code == 200
+            assert len(server.requests) == 2
+
+            # The 200 is cached, the 403 is not
+            assert get("bad").status_code == 200
+            assert len(server.requests) == 2
+
+
+def test_caching_proxy_times_out_hung_upstream():
+    url_tail = f"{API_PATH}?data[]=value&facets[parent][]=CISO&start=2024-01-01T00&end=2024-01-01T23"
+    with MockEIAServer(latency=3.0) as server, tempfile.TemporaryDirectory() as tmp_dir:
+        with EIACachingProxy(
+            cache_dir=tmp_dir, port=0, upstream_url=server.base_url, timeout=0.5
+        ) as proxy:
+
+            def get(api_key):
+                return requests.get(f"{proxy.base_url}{url_tail}&api_key={api_key}")
+
+            # The leader and the request waiting on it both get a 504 after the timeout
+            start_time = time.time()
+            with ThreadPoolExecutor() as executor:
+                leader = executor.submit(get, "a")
+                time.sleep(0.1)
+                waiter = executor.submit(get, "b")
+                assert leader.result().status_code == 504
+                assert waiter.result().status_code == 504
+            assert time.time() - start_time < 2.0
+            assert proxy.get_stats()["timeouts"] == 2
+            assert proxy.get_stats()["cache_entries"] == 0
+
+
+def test_caching_proxy_evicts_least_recently_used():
+    with MockEIAServer() as server, tempfile.TemporaryDirectory() as tmp_dir:
+        with EIACachingProxy(
+            cache_dir=tmp_dir,
+            max_cache_bytes=300_000,
+            port=0,
+            upstream_url=server.base_url,
+        ) as proxy:
+            fetch_through(proxy.base_url, "a")
+            stats = proxy.get_stats()
+            assert stats["evictions"] > 0
+            assert stats["cache_bytes"] <= 300_000
+            assert (
+                sum(
+                    os.path.getsize(os.path.join(tmp_dir, f))
+                    for f in os.listdir(tmp_dir)
+                )
+                <= 300_000
+            )
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+    test_caching_proxy_fetches_once_per_host()
+    test_caching_proxy_does_not_share_errors()
+    test_caching_proxy_times_out_hung_upstream()
+    test_caching_proxy_evicts_least_recently_used()
+    end_time = time.time()
+
+    print(f"\nElapsed time: {end_time - start_time} seconds")
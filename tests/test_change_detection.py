@@ -0,0 +1,103 @@
+import datetime
+import os
+import sys
+import tempfile
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import duckdb
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.append(os.path.dirname(__file__))
+from eia_client import EIAPolarClient
+from mock_eia_server import MockEIAServer, mock_value
+
+
+def test_refresh_rewrites_only_revised_rows():
+    api_path = "electricity/rto/region-sub-ba-data/data/"
+    facets = {"parent": "CISO"}  # 3 time series in the mock server
+    dt_start = datetime.datetime(2024, 3, 1, 0)
+    dt_end = datetime.datetime(2024, 3, 20, 23)
+
+    with MockEIAServer() as server, tempfile.TemporaryDirectory() as tmp_dir:
+        client = EIAPolarClient("mock-key", base_url=server.base_url)
+        path = os.path.join(tmp_dir, "eia.duckdb")
+
+        def refresh():
+            return client.refresh_duckdb(
+                api_path, facets, dt_start, dt_end, path=path, max_rows_request=300
+            )
+
+        df = refresh()
+        n_rows = df.height
+        # The first window of the grid is cut at dt_start: no hour before it is requested nor stored
+        assert n_rows == 480 * 3
+        assert df["period"].min() == dt_start.replace(tzinfo=datetime.timezone.utc)
+        starts = [parse_qs(urlsplit(url).query)["start"][0] for url in server.requests]
+        assert min(starts) == "2024-03-01T00"
+
+        # Nothing changed upstream: every chunk is skipped
+        assert refresh().is_empty()
+
+        # Revise the last 30 hours: only those rows are upserted
+        server.revision = 7
+        server.revised_from = datetime.datetime(2024, 3, 19, 18)
+        df = refresh()
+        assert df.height == 30 * 3
+        assert df["period"].min() == datetime.datetime(
+            2024, 3, 19, 18, tzinfo=datetime.timezone.utc
+        )
+
+        with duckdb.connect(path, read_only=True) as con:
+            assert con.execute("SELECT COUNT(*) FROM eia_data").fetchone()[0] == n_rows
+            value = con.execute(
+                "SELECT value FROM eia_data WHERE subba = 'SCE' AND period = '2024-03-20 12:00:00+00'"
+            ).fetchone()[0]
+            assert value == mock_value(
+                "SCE", datetime.datetime(2024, 3, 20, 12), revision=7
+            )
+            daily = con.execute(
+                "SELECT value FROM eia_data_daily WHERE subba = 'SCE' AND bucket = '2024-03-20 00:00:00+00'"
+            ).fetchone()[0]
+            assert daily == sum(
+                mock_value("SCE", datetime.datetime(2024, 3, 20, h), revision=7)
+                for h in range(24)
+            )
+
+        # Only the revised chunks are recorded again
+        assert refresh().is_empty()
+
+    return print("\nChange detection test passed!")
+
+
+def test_refresh_requests_only_the_refetch_window():
+    api_path = "electricity/rto/region-sub-ba-data/data/"
+    facets = {"subba": "SDGE"}  # 1 time series: daily-sized steps would span months
+    dt_start = datetime.datetime(2024, 3, 13, 0)
+    dt_end = datetime.datetime(2024, 3, 20, 0)
+
+    with MockEIAServer() as server, tempfile.TemporaryDirectory() as tmp_dir:
+        client = EIAPolarClient("mock-key", base_url=server.base_url)
+        path = os.path.join(tmp_dir, "eia.duckdb")
+        df = client.refresh_duckdb(api_path, facets, dt_start, dt_end, path=path)
+
+        queries = [parse_qs(urlsplit(url).query) for url in server.requests]
+        assert min(query["start"][0] for query in queries) >= "2024-03-13T00"
+        assert max(query["end"][0] for query in queries) <= "2024-03-20T00"
+        assert df.height == 7 * 24 + 1
+        assert df["period"].min() >= dt_start.replace(tzinfo=datetime.timezone.utc)
+
+        with duckdb.connect(path, read_only=True) as con:
+            assert (
+                con.execute("SELECT COUNT(*) FROM eia_data").fetchone()[0] == 7 * 24 + 1
+            )
+
+    return print("\nRefresh window test passed!")
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+    test_refresh_rewrites_only_revised_rows()
+    test_refresh_requests_only_the_refetch_window()
+    end_time = time.time()
+    print(f"\nExecution time: {end_time - start_time:.2f} seconds")
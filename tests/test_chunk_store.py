@@ -0,0 +1,160 @@
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.append(os.path.dirname(__file__))
+from eia_client import ArrowChunkStore, EIAPolarClient
+from mock_eia_server import MockEIAServer
+
+
+def test_chunk_store_reload():
+    api_path = "electricity/rto/region-sub-ba-data/data/"
+    facets = {"parent": "CISO"}  # 3 time series in the mock server
+    dt_start = datetime.datetime(2024, 1, 1, 0)
+    dt_end = datetime.datetime(2024, 1, 10, 23)
+
+    with MockEIAServer() as server, tempfile.TemporaryDirectory() as tmp_dir:
+        client = EIAPolarClient("mock-key", chunk_store=ArrowChunkStore(tmp_dir))
+        client.BASE_URL = server.base_url
+
+        df = client.get_eia_hourly_data(
+            api_path=api_path,
+            facets=facets,
+            start=dt_start,
+            end=dt_end,
+            max_rows_request=100,
+        )
+        n_requests = len(server.requests)
+        assert df.height == 240 * 3
+        assert df["period"].is_sorted()
+
+        # A sub-range is assembled from the memory-mapped chunks, without any request
+        df_sub = client.get_eia_hourly_data(
+            api_path=api_path,
+            facets={"parent": ["CISO"]},
+            start=datetime.datetime(2024, 1, 2, 5),
+            end=datetime.datetime(2024, 1, 5, 7),
+        )
+        assert len(server.requests) == n_requests
+        assert df_sub.height == (3 * 24 + 3) * 3
+        assert df_sub["period"].min() == datetime.datetime(
+            2024, 1, 2, 5, tzinfo=datetime.timezone.utc
+        )
+        assert df_sub["period"].max() == datetime.datetime(
+            2024, 1, 5, 7, tzinfo=datetime.timezone.utc
+        )
+
+        # Extending the range only requests the missing chunks
+        df_ext = client.get_eia_hourly_data(
+            api_path=api_path,
+            facets=facets,
+            start=dt_start,
+            end=datetime.datetime(2024, 1, 12, 23),
+            max_rows_request=100,
+        )
+        assert df_ext.height == 288 * 3
+        assert df_ext.slice(0, df.height).equals(df)
+
+    return print(df_ext)
+
+
+def test_chunk_store_keeps_only_covered_hours():
+    api_path = "electricity/rto/region-sub-ba-data/data/"
+    facets = {"parent": "CISO"}  # 3 time series in the mock server
+    dt_start = datetime.datetime(2024, 1, 1, 0)
+    dt_end = datetime.datetime(2024, 1, 1, 23)
+
+    with MockEIAServer() as server, tempfile.TemporaryDirectory() as tmp_dir:
+        client = EIAPolarClient(
+            "mock-key", chunk_store=ArrowChunkStore(tmp_dir), base_url=server.base_url
+        )
+
+        # A response cut at 39 of 72 rows: 13 full hours
+        server.max_rows = 39
+        df = client.get_eia_hourly_data(
+            api_path=api_path, facets=facets, start=dt_start, end=dt_end
+        )
+        assert df.height == 39
+        assert [w[:2] for w in client.chunk_store.windows(api_path, facets)] == [
+            (dt_start, datetime.datetime(2024, 1, 1, 12))
+        ]
+
+        # Once the rest is published, the missing hours are requested
+        server.max_rows = 5000
+        df = client.get_eia_hourly_data(
+            api_path=api_path, facets=facets, start=dt_start, end=dt_end
+        )
+        assert df.height == 72
+        assert client.chunk_store.get(api_path, facets, dt_start, dt_end).height == 72
+
+    return print("\nCovered hours test passed!")
+
+
+def test_chunk_store_timezones_and_expiry():
+    api_path = "electricity/rto/region-sub-ba-data/data/"
+    facets = {"parent": "CISO"}  # 3 time series in the mock server
+    utc = datetime.timezone.utc
+    dt_start = datetime.datetime(2024, 1, 1, 0, tzinfo=utc)
+    dt_end = datetime.datetime(2024, 1, 3, 23, tzinfo=utc)
+
+    with MockEIAServer() as server, tempfile.TemporaryDirectory() as tmp_dir:
+        store = ArrowChunkStore(tmp_dir, max_age=60.0)
+        client = EIAPolarClient("mock-key", chunk_store=store, base_url=server.base_url)
+
+        # Timezone-aware ranges are stored and served as naive UTC
+        df = client.get_eia_hourly_data(
+            api_path=api_path,
+            facets=facets,
+            start=dt_start,
+            end=dt_end,
+            max_rows_request=100,
+        )
+        n_requests = len(server.requests)
+        assert store.windows(api_path, facets)
+        df_reload = client.get_eia_hourly_data(
+            api_path=api_path,
+            facets=facets,
+            start=dt_start,
+            end=dt_end,
+            max_rows_request=100,
+        )
+        assert len(server.requests) == n_requests
+        assert df_reload.equals(df)
+
+        # Written a year later, the chunks are final: they never expire
+        paths = [w[2] for w in store.windows(api_path, facets)]
+        year_later = datetime.datetime(2025, 1, 1, tzinfo=utc).timestamp()
+        for path in paths:
+            os.utime(path, (year_later, year_later))
+        assert store.get(api_path, facets, dt_start, dt_end) is not None
+
+        # Written right after the hours, they may be revised: served max_age seconds only
+        written = datetime.datetime(2024, 1, 4, 1, tzinfo=utc).timestamp()
+        for path in paths:
+            os.utime(path, (written, written))
+        assert store.get(api_path, facets, dt_start, dt_end) is None
+        server.revision = 2
+        df = client.get_eia_hourly_data(
+            api_path=api_path,
+            facets=facets,
+            start=dt_start,
+            end=dt_end,
+            max_rows_request=100,
+        )
+        assert len(server.requests) > n_requests
+        assert not df.equals(df_reload)
+
+    return print("\nTimezones and expiry test passed!")
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+    test_chunk_store_reload()
+    test_chunk_store_keeps_only_covered_hours()
+    test_chunk_store_timezones_and_expiry()
+    end_time = time.time()
+
+    print(f"\nElapsed time: {end_time - start_time} seconds")
@@ -0,0 +1,69 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import polars as pl
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.append(os.path.dirname(__file__))
+from eia_client.cli import main
+from mock_eia_server import MockEIAServer
+
+
+def test_cli_lazy_imports():
+    code = (
+        "import sys, eia_client, eia_client.cli; "
+        "assert not {'polars', 'duckdb', 'requests'} & set(sys.modules), sys.modules.keys()"
+    )
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.path.join(os.path.dirname(__file__), "..", "src"),
+    }
+    subprocess.run([sys.executable, "-c", code], env=env, check=True)
+
+
+def test_cli_fetch_sync_export():
+    api_path = "electricity/rto/region-sub-ba-data/data/"
+
+    with MockEIAServer() as server, tempfile.TemporaryDirectory() as tmp_dir:
+        common = [
+            api_path,
+            "--facet",
+            "parent=CISO",
+            "--facet",
+            "subba=SDGE",
+            "--facet",
+            "subba=SCE",
+            "--start",
+            "2024-01-01T00",
+            "--end",
+            "2024-01-03",
+            "--api-key",
+            "mock-key",
+            "--base-url",
+            server.base_url,
+        ]
+        parquet_path = os.path.join(tmp_dir, "eia.parquet")
+        db_path = os.path.join(tmp_dir, "eia.duckdb")
+        export_path = os.path.join(tmp_dir, "export.parquet")
+
+        assert main(["fetch", *common, "-o", parquet_path]) == 0
+        df = pl.read_parquet(parquet_path)
+        assert df.height == 49 * 2
+
+        assert main(["sync", *common, "--db", db_path]) == 0
+        assert main(["export", "--db", db_path, "-o", export_path]) == 0
+        assert pl.read_parquet(export_path).height == df.height
+
+    return print(df)
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+    test_cli_lazy_imports()
+    test_cli_fetch_sync_export()
+    end_time = time.time()
+
+    print(f"\nElapsed time: {end_time - start_time} seconds")
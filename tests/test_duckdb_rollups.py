@@ -0,0 +1,114 @@
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+import duckdb
+import polars as pl
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.append(os.path.dirname(__file__))
+from eia_client import EIAPolarClient
+from mock_eia_server import MockEIAServer
+
+
+def test_duckdb_rollups_incremental():
+    api_path = "electricity/rto/region-sub-ba-data/data/"
+    facets = {"parent": "CISO"}
+
+    with MockEIAServer() as server, tempfile.TemporaryDirectory() as tmp_dir:
+        client = EIAPolarClient("mock-key")
+        client.BASE_URL = server.base_url
+        path = os.path.join(tmp_dir, "eia.duckdb")
+
+        df = client.get_eia_hourly_data(
+            api_path=api_path,
+            facets=facets,
+            start=datetime.datetime(2023, 12, 1, 0),
+            end=datetime.datetime(2024, 1, 31, 23),
+        )
+        client.save_df_as_duckdb(df, path=path)
+
+        # Revised and new hours are upserted and only their buckets recomputed
+        server.revision = 5
+        df_new = client.get_eia_hourly_data(
+            api_path=api_path,
+            facets=facets,
+            start=datetime.datetime(2024, 1, 31, 0),
+            end=datetime.datetime(2024, 2, 2, 23),
+        )
+        client.save_df_as_duckdb(df_new, path=path)
+
+        con = duckdb.connect(path, read_only=True)
+        con.execute("SET TimeZone = 'UTC'")
+        assert (
+            con.execute("SELECT COUNT(*) FROM eia_data").fetchone()[0]
+            == (62 + 2) * 24 * 3
+        )
+        df_expected = con.execute("""
+            SELECT subba, date_trunc('month', period) AS bucket, SUM(value) AS value
+            FROM eia_data GROUP BY ALL ORDER BY subba, bucket
+            """).pl()
+        con.close()
+
+        for grain in ("monthly", "yearly", "weekly", "daily"):
+            df_rollup = client.query_duckdb_rollup(grain, path=path)
+            assert df_rollup["n_hours"].sum() == (62 + 2) * 24 * 3
+
+        df_monthly = client.query_duckdb_rollup(
+            "monthly", path=path, start=datetime.datetime(2024, 1, 1)
+        )
+        assert df_monthly.select("subba", "bucket", "value").equals(
+            df_expected.filter(pl.col("bucket").dt.year() == 2024)
+        )
+
+    return print(df_monthly)
+
+
+def test_duckdb_rollups_kept_fresh_without_rollups():
+    api_path = "electricity/rto/region-sub-ba-data/data/"
+    facets = {"parent": "CISO"}
+
+    with MockEIAServer() as server, tempfile.TemporaryDirectory() as tmp_dir:
+        client = EIAPolarClient("mock-key", base_url=server.base_url)
+        path = os.path.join(tmp_dir, "eia.duckdb")
+        start, end = datetime.datetime(2024, 1, 1, 0), datetime.datetime(2024, 1, 3, 23)
+
+        df = client.get_eia_hourly_data(
+            api_path=api_path, facets=facets, start=start, end=end
+        )
+        client.save_df_as_duckdb(df, path=path, rollups=("daily",))
+
+        # Revised hours upserted with rollups=None: the existing daily rollup is still refreshed
+        server.revision = 5
+        df_new = client.get_eia_hourly_data(
+            api_path=api_path, facets=facets, start=start, end=end
+        )
+        client.save_df_as_duckdb(df_new, path=path, rollups=None)
+
+        con = duckdb.connect(path, read_only=True)
+        tables = {
+            row[0]
+            for row in con.execute(
+                "SELECT table_name FROM information_schema.tables"
+            ).fetchall()
+        }
+        total = con.execute("SELECT SUM(value) FROM eia_data").fetchone()[0]
+        con.close()
+        assert "eia_data_monthly" not in tables
+
+        df_daily = client.query_duckdb_rollup("daily", path=path)
+        assert abs(df_daily["value"].sum() - total) < 1e-6
+        assert abs(df_daily["value"].sum() - df_new["value"].sum()) < 1e-6
+
+    return print(df_daily)
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+    test_duckdb_rollups_incremental()
+    test_duckdb_rollups_kept_fresh_without_rollups()
+    end_time = time.time()
+
+    print(f"\nElapsed time: {end_time - start_time} seconds")
@@ -0,0 +1,66 @@
+import datetime
+import os
+import sys
+import time
+from collections import Counter
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.append(os.path.dirname(__file__))
+from eia_client import APIKeyPool, EIAPolarClient
+from mock_eia_server import MockEIAServer
+
+
+def test_key_pool_spreads_requests_and_benches_rate_limited_keys():
+    api_path = "electricity/rto/region-sub-ba-data/data/"
+    facets = {"parent": "CISO"}
+
+    def error_fn(n_request, query):
+        return 429 if dict(query)["api_key"] == "key-limited" else None
+
+    with MockEIAServer(error_fn=error_fn) as server:
+        pool = APIKeyPool(
+            ["key-a", "key-limited", "key-b"], rate_per_second=50.0, burst=5
+        )
+        client = EIAPolarClient(pool)
+        client.BASE_URL = server.base_url
+
+        df = client.get_eia_hourly_data(
+            api_path=api_path,
+            facets=facets,
+            start=datetime.datetime(2024, 1, 1, 0),
+            end=datetime.datetime(2024, 3, 31, 23),
+            max_rows_request=600,
+        )
+
+        keys_used = Counter(
+            parse_qs(urlsplit(path).query)["api_key"][0] for path in server.requests
+        )
+
+    assert df.height == 91 * 24 * 3
+    # The rate-limited key was only tried by the requests in flight when it got benched
+    assert 1 <= keys_used["key-limited"] <= 5
+    assert pool.healthy_keys() == ["key-a", "key-b"]
+    assert abs(keys_used["key-a"] - keys_used["key-b"]) <= 3
+
+    return print(keys_used)
+
+
+def test_key_pool_rate_budget():
+    pool = APIKeyPool(["key-a", "key-b"], rate_per_second=20.0, burst=1)
+    start_time = time.time()
+    keys = [pool.acquire() for _ in range(12)]
+    elapsed = time.time() - start_time
+
+    # 2 tokens at once, then 2 keys x 20 tokens/s
+    assert 0.2 < elapsed < 0.5
+    assert Counter(keys) == {"key-a": 6, "key-b": 6}
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+    test_key_pool_spreads_requests_and_benches_rate_limited_keys()
+    test_key_pool_rate_budget()
+    end_time = time.time()
+
+    print(f"\nElapsed time: {end_time - start_time} seconds")
@@ -0,0 +1,102 @@
+import datetime
+import os
+import sys
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import polars as pl
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.append(os.path.dirname(__file__))
+from eia_client import EIAPolarClient
+from eia_client.live_tail import LiveTail
+from mock_eia_server import MockEIAServer, mock_value
+
+
+def test_live_tail_polls_only_newest_hours():
+    api_path = "electricity/rto/region-sub-ba-data/data/"
+    facets = {"parent": "CISO"}
+    now = datetime.datetime(2024, 6, 1, 12, 30)
+
+    with MockEIAServer() as server:
+        client = EIAPolarClient("mock-key")
+        client.BASE_URL = server.base_url
+        tail = LiveTail(client, api_path, facets, window_hours=48, overlap_hours=3)
+        notifications = []
+        tail.subscribe(notifications.append)
+
+        tail.start(now=now)
+        assert tail.to_polars().height == 48 * 3
+
+        # Two hours later, EIA revised its data: the poll gets 2 new hours and 3 revised ones per series
+        server.revision = 1
+        n_requests = len(server.requests)
+        deltas = tail.poll(now=now + datetime.timedelta(hours=2))
+        assert len(server.requests) == n_requests + 1
+        query = parse_qs(urlsplit(server.requests[-1]).query)
+        assert query["start"] == ["2024-06-01T10"]
+        assert query["end"] == ["2024-06-01T14"]
+        assert deltas.height == (2 + 3) * 3
+        assert len(notifications) == 2
+
+        # Nothing changed: no notification
+        tail.poll(now=now + datetime.timedelta(hours=2))
+        assert len(notifications) == 2
+
+        df = tail.to_polars()
+        assert df.height == 48 * 3
+        assert df.columns == deltas.columns
+        assert df["period"].max() == datetime.datetime(
+            2024, 6, 1, 14, tzinfo=datetime.timezone.utc
+        )
+        assert df["period"].min() == datetime.datetime(
+            2024, 5, 30, 15, tzinfo=datetime.timezone.utc
+        )
+        row = df.filter(pl.col("subba") == "SDGE").row(-1, named=True)
+        assert row["value"] == mock_value(
+            "SDGE", datetime.datetime(2024, 6, 1, 14), revision=1
+        )
+
+        # After a long pause, a single request for the last window only
+        tail.poll(now=now + datetime.timedelta(days=10))
+        query = parse_qs(urlsplit(server.requests[-1]).query)
+        assert query["start"] == ["2024-06-09T13"]
+        assert query["end"] == ["2024-06-11T12"]
+        assert tail.to_polars().height == 48 * 3
+
+    return print(df)
+
+
+def test_live_tail_long_pause_is_split_below_the_row_cap():
+    api_path = "electricity/rto/region-sub-ba-data/data/"
+    now = datetime.datetime(2024, 6, 1, 12, 30)
+
+    with MockEIAServer() as server:  # Responses capped at 5000 rows
+        client = EIAPolarClient("mock-key", base_url=server.base_url)
+        tail = LiveTail(
+            client, api_path, None, window_hours=1300
+        )  # 4 series in the mock server
+
+        tail.start(now=now)
+        assert tail.to_polars().height == 1300 * 4
+
+        # 1300 hours x 4 series to catch up: split in chunks, none truncated
+        n_requests = len(server.requests)
+        tail.poll(now=now + datetime.timedelta(days=100))
+        assert len(server.requests) - n_requests > 2
+        df = tail.to_polars()
+        assert df.height == 1300 * 4
+        assert df["period"].max() == datetime.datetime(
+            2024, 9, 9, 12, tzinfo=datetime.timezone.utc
+        )
+
+    return print("\nLive tail long pause test passed!")
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+    test_live_tail_polls_only_newest_hours()
+    test_live_tail_long_pause_is_split_below_the_row_cap()
+    end_time = time.time()
+
+    print(f"\nElapsed time: {end_time - start_time} seconds")
@@ -0,0 +1,189 @@
+import datetime
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import duckdb
+import polars as pl
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.append(os.path.dirname(__file__))
+from eia_client import EIAPolarClient
+from eia_client.maintenance import (
+    BackgroundMaintenance,
+    compact_duckdb,
+    compact_parquet,
+)
+from eia_client.rollups import DuckDBRollups
+from mock_eia_server import MockEIAServer, mock_value
+
+
+def test_compaction_of_duckdb_and_parquet():
+    api_path = "electricity/rto/region-sub-ba-data/data/"
+    facets = {"parent": "CISO"}  # 3 time series in the mock server
+
+    with MockEIAServer() as server, tempfile.TemporaryDirectory() as tmp_dir:
+        client = EIAPolarClient("mock-key", base_url=server.base_url)
+        path = os.path.join(tmp_dir, "eia.duckdb")
+
+        # Many small daily appends, then a revision of the whole range
+        for day in range(1, 21):
+            df = client.fetch_chunk(
+                api_path,
+                facets,
+                datetime.datetime(2024, 4, day, 0),
+                datetime.datetime(2024, 4, day, 23),
+            )
+            client.save_df_as_duckdb(df, path=path)
+            df.write_parquet(os.path.join(tmp_dir, f"eia_{day:02d}.parquet"))
+            time.sleep(0.01)  # Distinct file mtimes
+        server.revision = 3
+        client.refresh_duckdb(
+            api_path,
+            facets,
+            datetime.datetime(2024, 4, 1),
+            datetime.datetime(2024, 4, 20, 23),
+            path=path,
+            max_rows_request=72,  # Daily chunks
+        )
+        df_revised = client.fetch_chunk(
+            api_path,
+            facets,
+            datetime.datetime(2024, 4, 1),
+            datetime.datetime(2024, 4, 20, 23),
+        )
+        df_revised.write_parquet(os.path.join(tmp_dir, "eia_revised.parquet"))
+
+        # A superseded revision left behind, e.g. by an interrupted upsert
+        with duckdb.connect(path) as con:
+            con.execute(
+                "INSERT INTO eia_data SELECT * FROM eia_data WHERE period < '2024-04-02 00:00:00+00'"
+            )
+            DuckDBRollups(con).rebuild()  # The rollups count the superseded rows too
+
+        report = compact_duckdb(path)
+        assert report["before"]["rows"] == 480 * 3 + 24 * 3
+        assert report["after"]["rows"] == 480 * 3
+        assert report["after"]["row groups"] <= report["before"]["row groups"]
+
+        with duckdb.connect(path, read_only=True) as con:
+            con.execute("SET TimeZone = 'UTC'")
+            df = con.execute("SELECT * FROM eia_data").pl()
+            n_hashes = con.execute(
+                "SELECT COUNT(*) FROM eia_data_chunk_hashes"
+            ).fetchone()[0]
+            n_daily = con.execute("SELECT COUNT(*) FROM eia_data_daily").fetchone()[0]
+            # The rollups match the deduplicated rows
+            n_stale = con.execute(
+                "SELECT COUNT(*) FROM eia_data_daily r JOIN ("
+                "SELECT subba, date_trunc('day', period) AS bucket, SUM(value) AS value "
+                "FROM eia_data GROUP BY ALL) t USING (subba, bucket) WHERE r.value <> t.value"
+            ).fetchone()[0]
+            n_hours = con.execute(
+                "SELECT SUM(n_hours) FROM eia_data_monthly"
+            ).fetchone()[0]
+        assert df["period"].is_sorted()
+        assert df.select("period", "subba").is_duplicated().sum() == 0
+        assert n_hashes > 0 and n_daily == 20 * 3
+        assert n_stale == 0 and n_hours == 480 * 3
+        row = df.filter(pl.col("subba") == "SCE").row(5, named=True)
+        assert row["value"] == mock_value(
+            "SCE", datetime.datetime(2024, 4, 1, 5), revision=3
+        )
+
+        # Nothing changed upstream: the compacted file keeps serving refreshes (chunk hash constraints)
+        assert client.refresh_duckdb(
+            api_path,
+            facets,
+            datetime.datetime(2024, 4, 1),
+            datetime.datetime(2024, 4, 20, 23),
+            path=path,
+            max_rows_request=72,  # Daily chunks
+        ).is_empty()
+
+        # Files of another schema are not merged; the inputs are kept by default
+        source = os.path.join(tmp_dir, "eia_*.parquet")
+        output = os.path.join(tmp_dir, "eia_compacted.parquet")
+        pl.DataFrame({"period": ["2024-04-01T00"], "other": [1]}).write_parquet(
+            os.path.join(tmp_dir, "eia_other.parquet")
+        )
+        with pytest.raises(ValueError):
+            compact_parquet(source, output)
+        os.remove(os.path.join(tmp_dir, "eia_other.parquet"))
+        compact_parquet(source, output)
+        assert len(os.listdir(tmp_dir)) == 23
+        # The kept inputs are not merged again until one of them changes
+        maintenance = BackgroundMaintenance(
+            parquet_source=source, parquet_output=output
+        )
+        assert maintenance.run_once() == []
+        os.remove(output)
+
+        # 21 Parquet files merged into one, the revised rows winning
+        with BackgroundMaintenance(
+            interval_seconds=3600,
+            parquet_source=source,
+            parquet_output=output,
+            remove_inputs=True,
+        ) as maintenance:
+            pass
+        report = maintenance.reports[0]
+        assert report["before"]["files"] == 21 and report["after"]["files"] == 1
+        df_pq = pl.read_parquet(output)
+        assert sorted(os.listdir(tmp_dir)) == ["eia.duckdb", "eia_compacted.parquet"]
+        assert df_pq.height == 480 * 3
+        assert df_pq["period"].is_sorted()
+        assert df_pq.sort("period", "subba").equals(df_revised.sort("period", "subba"))
+
+    return print("\nCompaction test passed!")
+
+
+def test_compaction_skips_are_reported():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "eia.duckdb")
+        with duckdb.connect(path) as con:
+            con.execute(
+                "CREATE TABLE eia_data AS SELECT TIMESTAMPTZ '2024-04-01 00:00:00+00' AS period, 1.0 AS value"
+            )
+
+        # A reader in another process holds a (read-only) connection open
+        reader = subprocess.Popen(
+            [
+                sys.executable,
+                "-c",
+                "import sys, time, duckdb; con = duckdb.connect(sys.argv[1], read_only=True); "
+                "print('connected', flush=True); time.sleep(60)",
+                path,
+            ],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            assert reader.stdout.readline().strip() == "connected"
+            maintenance = BackgroundMaintenance(
+                duckdb_path=path, max_consecutive_skips=2
+            )
+            assert maintenance.run_once() == []
+            assert maintenance.consecutive_skips == 1 and len(maintenance.skips) == 1
+            with pytest.raises(RuntimeError):
+                maintenance.run_once()
+        finally:
+            reader.kill()
+            reader.wait()
+
+        # Once the reader is gone, the compaction runs and the count is reset
+        assert len(maintenance.run_once()) == 1
+        assert maintenance.consecutive_skips == 0 and len(maintenance.skips) == 2
+
+    return print("\nCompaction skips test passed!")
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+    test_compaction_of_duckdb_and_parquet()
+    test_compaction_skips_are_reported()
+    end_time = time.time()
+    print(f"\nExecution time: {end_time - start_time:.2f} seconds")
@@ -0,0 +1,77 @@
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.append(os.path.dirname(__file__))
+from eia_client import EIAPolarClient
+from eia_client.planner import DATAFRAME_BYTES_PER_ROW, PYTHON_BYTES_PER_ROW
+from mock_eia_server import MockEIAServer
+
+
+def test_query_plan_calibrated_from_request_stats():
+    api_path = "electricity/rto/region-sub-ba-data/data/"
+    facets = {"parent": "CISO"}
+    dt_start = datetime.datetime(2024, 1, 1, 0)
+    dt_end = datetime.datetime(2024, 3, 31, 23)
+
+    with MockEIAServer(
+        latency=0.02
+    ) as server, tempfile.TemporaryDirectory() as tmp_dir:
+        client = EIAPolarClient("mock-key")
+        client.BASE_URL = server.base_url
+
+        plan = client.plan(
+            api_path, facets, dt_start, dt_end, max_rows_request=1000, concurrency=4
+        )
+        assert plan.n_timeseries == 3
+        assert plan.calibration.startswith("1 recorded")  # The probe itself
+        assert plan.est_rows == 91 * 24 * 3
+        # Chunk widths are rounded up to an even number of hours
+        assert all(chunk.est_rows <= 1000 + 3 for chunk in plan.chunks)
+        # Only the payloads of the concurrent chunks are parsed at once
+        assert plan.est_peak_memory_bytes == (
+            4 * plan.max_chunk_rows * PYTHON_BYTES_PER_ROW
+            + 2 * plan.est_rows * DATAFRAME_BYTES_PER_ROW
+        )
+        with pytest.raises(TypeError):
+            client.plan(api_path, facets, None, None)
+
+        n_requests = len(server.requests)
+        df = client.get_eia_hourly_data(
+            api_path, facets, dt_start, dt_end, max_rows_request=1000
+        )
+        # The plan is exactly what get_eia_hourly_data requests (probe + chunks)
+        assert len(server.requests) - n_requests == 1 + plan.n_requests
+        assert df.height == plan.est_rows
+
+        # Calibrated from the recorded requests, in this process or another one
+        stats_path = os.path.join(tmp_dir, "stats.json")
+        client.request_stats.save(stats_path)
+        other_client = EIAPolarClient("mock-key")
+        other_client.BASE_URL = server.base_url
+        other_client.request_stats.load(stats_path)
+        plan = other_client.plan(
+            api_path, facets, dt_start, dt_end, max_rows_request=1000, concurrency=4
+        )
+        bytes_per_row = other_client.request_stats.bytes_per_row()
+        assert (
+            abs(plan.est_response_bytes - plan.est_rows * bytes_per_row)
+            <= plan.n_requests
+        )
+        assert 0.0 < plan.est_duration_seconds < 5.0
+        assert plan.to_polars().height == plan.n_requests
+
+    return print(plan)
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+    test_query_plan_calibrated_from_request_stats()
+    end_time = time.time()
+
+    print(f"\nElapsed time: {end_time - start_time} seconds")
@@ -0,0 +1,72 @@
+import datetime
+import os
+import sys
+import threading
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.append(os.path.dirname(__file__))
+from eia_client import EIAPolarClient
+from mock_eia_server import MockEIAServer, mock_value
+
+
+def test_overlapping_chunks_are_coalesced():
+    api_path = "electricity/rto/region-sub-ba-data/data/"
+    windows = [
+        (datetime.datetime(2024, 1, 1, 0), datetime.datetime(2024, 1, 2, 23)),
+        (
+            datetime.datetime(2024, 1, 1, 0),
+            datetime.datetime(2024, 1, 2, 23),
+        ),  # identical
+        (
+            datetime.datetime(2024, 1, 2, 0),
+            datetime.datetime(2024, 1, 3, 23),
+        ),  # overlapping
+    ]
+    results = [None] * len(windows)
+
+    with MockEIAServer(latency=0.5) as server:
+        client = EIAPolarClient("mock-key", base_url=server.base_url)
+
+        def fetch(i):
+            # The facets are listed differently, yet the series is the same
+            facets = {"parent": "CISO"} if i % 2 else {"parent": ["CISO"]}
+            results[i] = client.fetch_chunk(api_path, facets, *windows[i])
+
+        threads = []
+        for i in range(len(windows)):
+            threads.append(threading.Thread(target=fetch, args=(i,)))
+            threads[-1].start()
+            time.sleep(0.1)  # The first window is in flight when the others arrive
+        for thread in threads:
+            thread.join()
+
+        # One request for the first window, one for the hours of the third not in flight
+        assert len(server.requests) == 2
+        starts = [
+            dict(parse_qsl(urlsplit(path).query))["start"] for path in server.requests
+        ]
+        assert sorted(starts) == ["2024-01-01T00", "2024-01-03T00"]
+
+    assert results[0].equals(results[1])
+    for (dt_start, dt_end), df in zip(windows, results):
+        n_hours = int((dt_end - dt_start) / datetime.timedelta(hours=1)) + 1
+        assert df.height == n_hours * 3
+        assert df["period"].is_sorted()
+        assert df["period"].min() == dt_start.replace(tzinfo=datetime.timezone.utc)
+        assert df["period"].max() == dt_end.replace(tzinfo=datetime.timezone.utc)
+        expected = [
+            mock_value(s, p.replace(tzinfo=None))
+            for s, p in zip(df["subba"], df["period"])
+        ]
+        assert df["value"].to_list() == expected
+
+    return print("\nIn-flight chunk coalescing test passed!")
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+    test_overlapping_chunks_are_coalesced()
+    end_time = time.time()
+    print(f"\nExecution time: {end_time - start_time:.2f} seconds")
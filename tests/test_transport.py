@@ -0,0 +1,91 @@
+import datetime
+import os
+import sys
+import time
+
+import pytest
+import requests
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.append(os.path.dirname(__file__))
+from eia_client import EIAClient, EIAPolarClient
+from eia_client.transport import (
+    HTTP2Transport,
+    RequestsTransport,
+    Transport,
+    make_transport,
+)
+from mock_eia_server import MockEIAServer
+
+
+def test_transports_return_the_same_data():
+    pytest.importorskip("httpx")
+    pytest.importorskip("h2")
+    api_path = "electricity/rto/region-sub-ba-data/data/"
+    facets = {"parent": "CISO"}
+    dt_start = datetime.datetime(2024, 2, 1, 0)
+    dt_end = datetime.datetime(2024, 2, 10, 23)
+
+    assert isinstance(make_transport("auto"), HTTP2Transport)
+    assert isinstance(make_transport("http1"), RequestsTransport)
+
+    dfs = []
+    with MockEIAServer(
+        error_fn=lambda n, query: 500 if ("start", "2099-01-01T00") in query else None
+    ) as server:
+        for transport in ("http1", "http2"):
+            with EIAPolarClient(
+                "mock-key", base_url=server.base_url, transport=transport
+            ) as client:
+                dfs.append(
+                    client.get_eia_hourly_data(
+                        api_path=api_path,
+                        facets=facets,
+                        start=dt_start,
+                        end=dt_end,
+                        max_rows_request=200,
+                    )
+                )
+                # Errors surface as requests exceptions, whatever the transport
+                with pytest.raises(requests.exceptions.HTTPError) as error:
+                    client.fetch_chunk(
+                        api_path,
+                        facets,
+                        datetime.datetime(2099, 1, 1),
+                        datetime.datetime(2099, 1, 2),
+                    )
+                assert error.value.response.status_code == 500
+
+    assert dfs[0].height == 240 * 3
+    assert dfs[0].equals(dfs[1])
+
+    return print("\nTransport test passed!")
+
+
+def test_clients_close_their_transport():
+    closed = []
+
+    class RecordingTransport(RequestsTransport):
+        def close(self) -> None:
+            closed.append(True)
+            super().close()
+
+    # The base class cannot be used without a get method
+    with pytest.raises(TypeError):
+        Transport()
+
+    with EIAClient("mock-key", transport=RecordingTransport()) as client:
+        assert isinstance(client.transport, RecordingTransport)
+    with EIAPolarClient("mock-key", transport=RecordingTransport()):
+        pass
+    assert closed == [True, True]
+
+    return print("\nTransport close test passed!")
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+    test_transports_return_the_same_data()
+    test_clients_close_their_transport()
+    end_time = time.time()
+    print(f"\nExecution time: {end_time - start_time:.2f} seconds")
@@ -0,0 +1,94 @@
+import datetime
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
+sys.path.append(os.path.dirname(__file__))
+from eia_client import ArrowChunkStore, EIAPolarClient
+from eia_client.work_queue import SQLiteWorkQueue, enqueue_backfill
+from mock_eia_server import MockEIAServer
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "src")
+
+
+def test_distributed_backfill_with_local_workers():
+    api_path = "electricity/rto/region-sub-ba-data/data/"
+    facets = {"parent": "CISO"}
+    dt_start = datetime.datetime(2024, 1, 1, 0)
+    dt_end = datetime.datetime(2024, 2, 29, 23)
+
+    with MockEIAServer(
+        latency=0.05
+    ) as server, tempfile.TemporaryDirectory() as tmp_dir:
+        client = EIAPolarClient(
+            "mock-key", chunk_store=ArrowChunkStore(os.path.join(tmp_dir, "chunks"))
+        )
+        client.BASE_URL = server.base_url
+        queue = SQLiteWorkQueue(
+            os.path.join(tmp_dir, "queue.sqlite"), lease_seconds=1.0
+        )
+
+        n_chunks = enqueue_backfill(
+            client, queue, api_path, facets, dt_start, dt_end, max_rows_request=300
+        )
+        assert n_chunks > 10
+        # Enqueuing twice is idempotent
+        assert (
+            enqueue_backfill(
+                client, queue, api_path, facets, dt_start, dt_end, max_rows_request=300
+            )
+            == 0
+        )
+
+        # A worker that crashed after claiming a chunk: its lease expires and another worker takes it
+        crashed_chunk = queue.claim("crashed-worker")
+
+        env = {**os.environ, "PYTHONPATH": SRC}
+        command = [
+            sys.executable,
+            "-m",
+            "eia_client",
+            "work",
+            "--queue",
+            queue.path,
+            "--chunk-store",
+            client.chunk_store.root,
+            "--api-key",
+            "mock-key",
+            "--base-url",
+            server.base_url,
+            "--lease-seconds",
+            "1",
+            "--poll-interval",
+            "0.1",
+        ]
+        workers = [
+            subprocess.Popen(command, env=env, stdout=subprocess.PIPE) for _ in range(3)
+        ]
+        outputs = [worker.communicate(timeout=60)[0].decode() for worker in workers]
+        assert all(worker.returncode == 0 for worker in workers), outputs
+
+        assert queue.progress() == {"done": n_chunks}
+        assert crashed_chunk is not None
+        n_requests = len(server.requests)
+
+        # Every chunk is in the shared store: the coordinator assembles the range without requests
+        df = client.get_eia_hourly_data(
+            api_path=api_path, facets=facets, start=dt_start, end=dt_end
+        )
+        assert len(server.requests) == n_requests
+        assert df.height == 60 * 24 * 3
+        assert df.select("period", "subba").is_duplicated().sum() == 0
+
+    return print(df)
+
+
+if __name__ == "__main__":
+    start_time = time.time()
+    test_distributed_backfill_with_local_workers()
+    end_time = time.time()
+
+    print(f"\nElapsed time: {end_time - start_time} seconds")